@@ -1,5 +1,7 @@
 # app.py
 import streamlit as st
+import hashlib
+import logging
 import os
 import tempfile
 from dotenv import load_dotenv
@@ -8,126 +10,160 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import core logic from src
-from src.xml_parser import extract_roles_from_xml
 from src.pdf_extractor_rag import RAGPDFExtractor
+from src.role_catalog import RoleCatalog
 from src.role_comparer import RoleComparer
-from config.config import FUZZY_MATCH_THRESHOLD, PINECONE_API_KEY, PINECONE_INDEX_NAME
-from pinecone import Pinecone
-import time # For optional Pinecone index deletion wait
+from src.pipeline import validate_document
+from src.jobs import JobManager, FAILED
+from src.metrics import metrics
+from config.config import FUZZY_MATCH_THRESHOLD, PINECONE_API_KEY, PINECONE_INDEX_NAME, PINECONE_RESET_INDEX, LOG_LEVEL, JOB_WORKERS
+import time # For optional Pinecone index deletion wait and job polling
 
+logging.basicConfig(level=LOG_LEVEL)
 
-def run_comparison(xml_file, pdf_file):
-    """
-    Handles the core logic for role extraction and comparison
-    after files have been uploaded.
-    """
-    # --- Create temporary files for processing ---
+XML_ROLE_XPATH = '//role/text()' # Ensure this XPath matches your XML structure
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def reset_pinecone_index():
+    """Deletes the Pinecone index so the extractor recreates it empty."""
+    from pinecone import Pinecone # Only needed for the reset, so not imported at startup
+    try:
+        pc_root = Pinecone(api_key=PINECONE_API_KEY)
+        if PINECONE_INDEX_NAME in pc_root.list_indexes().names():
+            logging.warning("Index '%s' already exists. Deleting for a fresh run...", PINECONE_INDEX_NAME)
+            pc_root.delete_index(PINECONE_INDEX_NAME)
+            time.sleep(5) # Give Pinecone time to process deletion
+    except Exception as e:
+        logging.error("Error during Pinecone index cleanup: %s. Continuing without full index cleanup.", e)
+
+
+# --- Resources shared by every session of this server process ---
+
+@st.cache_resource(show_spinner="Initializing PDF extractor and Pinecone client...")
+def get_pdf_extractor() -> RAGPDFExtractor:
+    # The index is long-lived and each document gets its own namespace, so concurrent
+    # sessions don't interfere. Only reset it (once per process) when PINECONE_RESET_INDEX is set.
+    if PINECONE_RESET_INDEX:
+        reset_pinecone_index()
+    # One cached extraction per concurrently running job, with room to spare
+    pdf_extractor = RAGPDFExtractor(extraction_cache_size=JOB_WORKERS * 2)
+    # Connect now, under the spinner, rather than during the first validation
+    pdf_extractor.connect()
+    return pdf_extractor
+
+
+@st.cache_resource(max_entries=32, show_spinner="Parsing XML file...")
+def get_catalog(xml_hash: str, _xml_bytes: bytes) -> RoleCatalog:
+    """Role catalog of an uploaded XML, keyed by content hash so re-uploads skip parsing."""
     with tempfile.NamedTemporaryFile(delete=False, suffix=".xml") as tmp_xml:
-        tmp_xml.write(xml_file.getvalue())
+        tmp_xml.write(_xml_bytes)
         xml_filepath = tmp_xml.name
+    try:
+        return RoleCatalog.from_xml(xml_filepath, XML_ROLE_XPATH)
+    finally:
+        os.remove(xml_filepath)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-        tmp_pdf.write(pdf_file.getvalue())
-        pdf_filepath = tmp_pdf.name
 
-    try:
-        st.subheader("Processing Initiated")
-        st.info("Loading configurations and initializing AI clients...")
-
-        # --- Optional: Clean Pinecone Index for a Fresh Start (especially for free tier) ---
-        st.markdown("\n--- **Pinecone Index Management** ---")
-        try:
-            # Re-initialize Pinecone client just for deletion check if needed
-            pc_root = Pinecone(api_key=PINECONE_API_KEY)
-            if PINECONE_INDEX_NAME in pc_root.list_indexes().names():
-                st.warning(f"Index '{PINECONE_INDEX_NAME}' already exists. Deleting for a fresh run...")
-                pc_root.delete_index(PINECONE_INDEX_NAME)
-                st.info(f"Index '{PINECONE_INDEX_NAME}' deleted. Waiting a few seconds for full removal...")
-                time.sleep(5) # Give Pinecone time to process deletion
-                st.success("Proceeding with new index creation.")
-            else:
-                st.info(f"Index '{PINECONE_INDEX_NAME}' does not exist. It will be created during processing.")
-        except Exception as e:
-            st.error(f"Error during Pinecone index cleanup: {e}. Please check your Pinecone API key and console.")
-            st.warning("Continuing without full index cleanup, which might cause issues.")
-
-
-        # --- 1. Extract roles from XML ---
-        st.subheader("Step 1: Extracting roles from XML")
-        with st.spinner("Parsing XML file..."):
-            xml_role_xpath = '//role/text()' # Ensure this XPath matches your XML structure
-            xml_roles = extract_roles_from_xml(xml_filepath, xml_role_xpath)
-            st.write(f"**Extracted XML Roles:** {xml_roles}")
-            if not xml_roles:
-                st.warning("No roles extracted from XML. Please check XML file and XPath.")
-
-        # --- 2. Initialize RAG PDF Extractor ---
-        st.subheader("Step 2: Initializing PDF Extractor and Pinecone")
-        with st.spinner("Initializing PDF extractor and Pinecone client. This may take a moment..."):
-            pdf_extractor = RAGPDFExtractor()
-
-        # --- 3. Process the PDF and extract roles ---
-        pdf_id = "uploaded-document" # A fixed ID for the uploaded PDF
-        st.subheader("Step 3: Processing PDF and Extracting Roles via Gemini")
-        with st.spinner(f"Clearing previous data for PDF ID: {pdf_id} in Pinecone (if any)..."):
-            pdf_extractor.clear_pdf_data(pdf_id)
-        
-        with st.spinner(f"Processing and indexing PDF: {pdf_file.name}. This involves embedding data..."):
-            pdf_extractor.process_pdf(pdf_filepath, pdf_id)
-            st.success(f"PDF processed and indexed into Pinecone.")
-
-        with st.spinner("Extracting roles from PDF using Gemini LLM. This may take a moment..."):
-            pdf_roles = pdf_extractor.extract_roles_from_pdf(pdf_filepath)
-            st.write(f"**Extracted PDF Roles (via RAG):** {pdf_roles}")
-            if not pdf_roles:
-                st.warning("No roles extracted from PDF. This might indicate issues with PDF content or LLM extraction prompt.")
-
-        # --- 4. Compare roles ---
-        st.subheader("Step 4: Comparing Roles")
-        comparer = RoleComparer(fuzzy_threshold=FUZZY_MATCH_THRESHOLD)
-        is_incorrect, matched_roles, incorrect_pdf_roles = comparer.compare_roles(xml_roles, pdf_roles)
-
-        # --- 5. Generate report ---
-        st.subheader("Step 5: Generating Report")
-        st.markdown("--- **Role Comparison Report** ---")
-        st.write(f"**Total Unique Roles in XML:** {len(xml_roles)}")
-        st.write(f"**Total Unique Roles found in PDF:** {len(pdf_roles)}")
-
-        st.markdown("\n--- **Roles Matched (XML to PDF)** ---")
-        if matched_roles:
-            for role in matched_roles:
-                st.write(f"- {role}")
-        else:
-            st.info("No roles from PDF matched any XML role.")
-
-        st.markdown("\n--- **INCORRECT PDF ROLES (Found in PDF but NOT matching any XML role)** ---")
-        if incorrect_pdf_roles:
-            st.error("There are roles in the PDF that do NOT match the XML definitions!")
-            for role in incorrect_pdf_roles:
-                st.write(f"- {role}")
-        else:
-            st.success("All roles found in the PDF match the XML definitions! (Or no roles were found in PDF).")
-
-        st.markdown("-----------------------------")
-        if is_incorrect:
-            st.error("CONCLUSION: Roles in the PDF are INCORRECT as there are roles that do not match the XML definitions.")
-        else:
-            st.success("CONCLUSION: All roles in the PDF are CORRECT according to the XML definitions.")
-
-        st.success("Process Completed!")
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    return JobManager()
 
-    except Exception as e:
-        st.error(f"An unexpected error occurred during the process: {e}")
-        st.exception(e) # Display full traceback in Streamlit
 
+def validation_job(pdf_extractor: RAGPDFExtractor, catalog: RoleCatalog, pdf_filepath: str, progress=None) -> dict:
+    """Runs on a job worker thread; removes the temporary PDF when done."""
+    try:
+        comparer = RoleComparer(fuzzy_threshold=FUZZY_MATCH_THRESHOLD)
+        # Content-addressed ID (and Pinecone namespace), so concurrent sessions never share data by accident
+        return validate_document(pdf_extractor, catalog, comparer, pdf_filepath, progress=progress)
     finally:
-        # --- Clean up temporary files ---
-        if os.path.exists(xml_filepath):
-            os.remove(xml_filepath)
         if os.path.exists(pdf_filepath):
             os.remove(pdf_filepath)
 
 
+def start_validation(xml_file, pdf_file):
+    """Parses (or reuses) the catalog and submits the validation as a background job."""
+    xml_bytes = xml_file.getvalue()
+    catalog = get_catalog(hashlib.sha256(xml_bytes).hexdigest(), xml_bytes)
+    pdf_extractor = get_pdf_extractor()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
+        tmp_pdf.write(pdf_file.getvalue())
+        pdf_filepath = tmp_pdf.name
+
+    job = get_job_manager().submit(validation_job, pdf_extractor, catalog, pdf_filepath)
+    st.session_state["job_id"] = job.id
+    st.session_state["job_files"] = (xml_file.name, pdf_file.name)
+    st.session_state["xml_role_count"] = len(catalog)
+
+
+def render_report(result: dict, xml_role_count: int):
+    if result["status"] == "error":
+        st.error(f"An unexpected error occurred during the process: {result['error']}")
+        return
+
+    if not xml_role_count:
+        st.warning("No roles extracted from XML. Please check XML file and XPath.")
+    pdf_roles = result["pdf_roles"]
+    st.write(f"**Extracted PDF Roles (via RAG):** {pdf_roles}")
+    if not pdf_roles:
+        st.warning("No roles extracted from PDF. This might indicate issues with PDF content or LLM extraction prompt.")
+    if result["vectors_failed"]:
+        st.warning(f"{result['vectors_failed']} chunks could not be indexed into Pinecone.")
+
+    st.markdown("--- **Role Comparison Report** ---")
+    st.write(f"**Total Unique Roles in XML:** {xml_role_count}")
+    st.write(f"**Total Unique Roles found in PDF:** {len(pdf_roles)}")
+
+    st.markdown("\n--- **Roles Matched (XML to PDF)** ---")
+    if result["matched_roles"]:
+        for role in result["matched_roles"]:
+            st.write(f"- {role}")
+    else:
+        st.info("No roles from PDF matched any XML role.")
+
+    st.markdown("\n--- **INCORRECT PDF ROLES (Found in PDF but NOT matching any XML role)** ---")
+    if result["incorrect_pdf_roles"]:
+        st.error("There are roles in the PDF that do NOT match the XML definitions!")
+        for role in result["incorrect_pdf_roles"]:
+            st.write(f"- {role}")
+    else:
+        st.success("All roles found in the PDF match the XML definitions! (Or no roles were found in PDF).")
+
+    st.markdown("-----------------------------")
+    if result["is_incorrect"]:
+        st.error("CONCLUSION: Roles in the PDF are INCORRECT as there are roles that do not match the XML definitions.")
+    else:
+        st.success("CONCLUSION: All roles in the PDF are CORRECT according to the XML definitions.")
+
+    st.success(f"Process Completed in {result['elapsed_seconds']:.1f}s!")
+    # Cumulative for this server process (shared by all sessions)
+    with st.expander("Pipeline metrics"):
+        st.text(metrics.summary())
+        st.json(metrics.snapshot())
+
+
+def show_job(job_id: str):
+    """Shows this session's job, rerunning the script until it finishes."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        st.info("The previous validation is no longer available. Please start a new one.")
+        del st.session_state["job_id"]
+        return
+
+    xml_name, pdf_name = st.session_state.get("job_files", ("", ""))
+    st.subheader(f"Validating {pdf_name} against {xml_name}")
+    if job.active:
+        st.progress(job.progress, text=f"{job.stage.capitalize()}...")
+        # The pipeline runs on a job worker thread, so polling doesn't hold up other sessions
+        time.sleep(POLL_INTERVAL_SECONDS)
+        st.rerun()
+    elif job.status == FAILED:
+        st.error(f"An unexpected error occurred during the process: {job.error}")
+    else:
+        render_report(job.result, st.session_state.get("xml_role_count", 0))
+
+
 st.set_page_config(page_title="Role Validator Application", layout="centered")
 st.title("📄 Role Validator Application")
 st.markdown("Upload your XML file (containing defined roles) and PDF file (containing roles to validate).")
@@ -138,7 +174,11 @@ uploaded_pdf_file = st.file_uploader("Upload PDF File (e.g., document_with_roles
 
 if uploaded_xml_file and uploaded_pdf_file:
     st.success("Both files uploaded successfully!")
-    if st.button("Start Validation"):
-        run_comparison(uploaded_xml_file, uploaded_pdf_file)
+    current_job = get_job_manager().get(st.session_state.get("job_id", ""))
+    if st.button("Start Validation", disabled=current_job is not None and current_job.active):
+        start_validation(uploaded_xml_file, uploaded_pdf_file)
 else:
-    st.info("Please upload both an XML and a PDF file to start the validation process.")
\ No newline at end of file
+    st.info("Please upload both an XML and a PDF file to start the validation process.")
+
+if "job_id" in st.session_state:
+    show_job(st.session_state["job_id"])
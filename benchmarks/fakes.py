@@ -0,0 +1,124 @@
+# benchmarks/fakes.py
+import hashlib
+import random
+import re
+import threading
+import time
+from src.gemini_client import GeminiClient
+from src.rate_limiter import RequestScheduler
+from src.vector_store import LocalVectorStore, UpsertSummary
+
+# Title words the fake LLM treats as the end of a job role ("Senior Data Engineer")
+_ROLE_PATTERN = re.compile(
+    r"\b(?:[A-Z][a-z]+ ){0,3}(?:Engineer|Manager|Developer|Analyst|Scientist|Tester|Designer|Director|"
+    r"Officer|Lead|Architect|Coordinator|Specialist|Consultant|Administrator|Technician)\b"
+)
+
+
+class FakeServiceError(Exception):
+    """A retryable failure injected by a fake backend (looks like an HTTP 503 to the scheduler)."""
+    code = 503
+
+
+class _Faults:
+    """Seeded latency and error injection shared by the fake backends."""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self, operation: str):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise FakeServiceError(f"Injected {operation} failure")
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = [text]
+
+
+class _FakeModel:
+    """Stands in for genai.GenerativeModel: answers role-extraction prompts by regex."""
+
+    def __init__(self, faults: _Faults):
+        self.faults = faults
+
+    def generate_content(self, prompt: str):
+        self.faults.apply("generate")
+        document = prompt.split("Document Content:", 1)[-1]
+        roles = list(dict.fromkeys(match.strip() for match in _ROLE_PATTERN.findall(document)))
+        return _FakeResponse(", ".join(roles) if roles else "None")
+
+
+class FakeGeminiClient(GeminiClient):
+    """
+    GeminiClient with the network calls replaced by deterministic local fakes.
+    Everything else (batching, rate limiting, retries, metrics) is the real
+    client code. Embeddings are pseudo-random unit-ish vectors seeded by the
+    text hash, so identical texts always embed identically.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 dimension: int = 768, embedding_batch_size: int = 100, embedding_cache=None):
+        self.dimension = dimension
+        self.faults = _Faults(latency, jitter, error_rate, seed)
+        super().__init__(
+            model_name="fake-gemini", embedding_model="fake-embedding", embedding_batch_size=embedding_batch_size,
+            embedding_cache=embedding_cache,
+            # Private schedulers (no quota) so benchmarks don't share state with anything else in the process
+            generate_scheduler=RequestScheduler(max_retries=5, backoff_base=0.001, backoff_max=0.01),
+            embed_scheduler=RequestScheduler(max_retries=5, backoff_base=0.001, backoff_max=0.01),
+            model=_FakeModel(self.faults), embed_content=self._fake_embed_content,
+        )
+
+    def _vector(self, text: str) -> list:
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimension)]
+
+    def _fake_embed_content(self, model: str, content):
+        self.faults.apply("embed")
+        if isinstance(content, str):
+            return {"embedding": self._vector(content)}
+        return {"embedding": [self._vector(text) for text in content]}
+
+
+class FakePineconeClient(LocalVectorStore):
+    """
+    In-memory vector store with Pinecone-like upsert behaviour: vectors go out
+    in batches, each batch pays `latency` and fails with probability
+    `error_rate` (failures are reported in the UpsertSummary, as the real
+    client does after exhausting its retries).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 upsert_batch_size: int = 100):
+        super().__init__(persist_dir=None)
+        self.faults = _Faults(latency, jitter, error_rate, seed)
+        self.upsert_batch_size = upsert_batch_size
+
+    def upsert_vectors(self, vectors: list, namespace: str = None) -> UpsertSummary:
+        summary = UpsertSummary(total=len(vectors))
+        for start in range(0, len(vectors), self.upsert_batch_size):
+            batch = vectors[start:start + self.upsert_batch_size]
+            try:
+                self.faults.apply("upsert")
+            except FakeServiceError as e:
+                summary.failed += len(batch)
+                summary.failed_ids.extend(vector[0] for vector in batch)
+                summary.errors.append(str(e))
+                continue
+            summary.upserted += super().upsert_vectors(batch, namespace).upserted
+        return summary
+
+    def query_vectors(self, query_embedding: list, top_k: int = 3, namespace: str = None) -> list:
+        self.faults.apply("query")
+        return super().query_vectors(query_embedding, top_k, namespace)
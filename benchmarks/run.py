@@ -0,0 +1,201 @@
+# benchmarks/run.py
+"""
+Offline benchmarks for the validation pipeline.
+
+Generates synthetic PDFs and XML catalogs, runs each stage against fake
+Gemini/Pinecone backends (no API keys or network needed) and reports the
+median time per stage. With --baseline, stage times are compared against a
+saved run, normalized by a CPU calibration loop so results from different
+machines are comparable, and the exit code is 1 if any stage regressed.
+
+    python -m benchmarks.run --scenarios small,medium --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.5
+"""
+import os
+
+# Benchmarks must not read or fill the on-disk caches of a real installation
+os.environ.setdefault("ROLE_CACHE_PATH", "")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("CHUNK_STORE_PATH", "")
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.fakes import FakeGeminiClient, FakePineconeClient
+from benchmarks.synthetic import make_catalog_xml, make_pdf
+from src.chunk_store import ChunkStore
+from src.chunker import iter_chunks
+from src.metrics import metrics
+from src.pdf_extractor_rag import RAGPDFExtractor
+from src.pipeline import validate_document
+from src.role_catalog import RoleCatalog
+from src.role_comparer import RoleComparer
+
+# name: (pages, tables per page, catalog size)
+SCENARIOS = {
+    "small": (5, 1, 200),
+    "medium": (50, 2, 2000),
+    "large": (300, 2, 20000),
+}
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Seconds for a fixed pure-Python workload; used to normalize timings across machines."""
+    def workload():
+        total = 0
+        for i in range(300000):
+            total += (i * i) % 7
+        return "".join(sorted(str(total) * 2000))
+
+    return min(_timed(workload) for _ in range(rounds))
+
+
+def _timed(fn: Callable) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _with_typos(roles: List[str], rate: float, seed: int) -> List[str]:
+    """Returns the roles with some of them misspelled, so fuzzy matching has work to do."""
+    rng = random.Random(seed)
+    result = []
+    for role in roles:
+        if len(role) > 4 and rng.random() < rate:
+            i = rng.randrange(1, len(role) - 1)
+            role = role[:i] + role[i + 1] + role[i] + role[i + 2:]
+        result.append(role)
+    return result
+
+
+def run_scenario(name: str, workdir: str, args) -> Dict[str, dict]:
+    pages, tables_per_page, catalog_size = SCENARIOS[name]
+    xml_path = os.path.join(workdir, f"{name}.xml")
+    pdf_path = os.path.join(workdir, f"{name}.pdf")
+    roles = make_catalog_xml(xml_path, catalog_size, seed=args.seed)
+    mentioned = make_pdf(pdf_path, pages, roles, tables_per_page=tables_per_page, seed=args.seed)
+    catalog = RoleCatalog.from_xml(xml_path, "//role/text()")
+    comparer = RoleComparer()
+
+    def new_extractor():
+        return RAGPDFExtractor(
+            gemini_client=FakeGeminiClient(latency=args.llm_latency, error_rate=args.error_rate, seed=args.seed),
+            vector_store=FakePineconeClient(latency=args.upsert_latency, error_rate=args.error_rate, seed=args.seed),
+            streaming_min_pages=0,
+            chunk_store=ChunkStore(":memory:"),
+        )
+
+    extractor = new_extractor()
+    extraction = extractor.extract(pdf_path)
+    pdf_roles = _with_typos(mentioned, 0.2, args.seed)
+
+    def extract():
+        extractor._extractions.clear()
+        extractor._extract_text_and_tables_from_pdf(pdf_path)
+
+    def role_extraction():
+        extractor.extract_roles_from_pdf(pdf_path, catalog=catalog)
+
+    def end_to_end():
+        result = validate_document(new_extractor(), catalog, comparer, pdf_path)
+        if result["status"] != "ok":
+            raise RuntimeError(f"End-to-end run failed: {result['error']}")
+
+    stages = {
+        "xml_parse": lambda: RoleCatalog.from_xml(xml_path, "//role/text()"),
+        "pdf_extraction": extract,
+        "chunking": lambda: list(iter_chunks(extraction.page_blocks, extraction.page_tables)),
+        "compare_roles": lambda: comparer.compare_roles(catalog, pdf_roles),
+        "role_extraction": role_extraction,
+        "end_to_end": end_to_end,
+    }
+    results = {}
+    for stage, fn in stages.items():
+        if stage == "end_to_end":
+            metrics.reset()
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            timings = [_timed(fn) for _ in range(args.repeat)]
+        results[stage] = {"median_seconds": statistics.median(timings), "min_seconds": min(timings)}
+    results["end_to_end"]["counters"] = metrics.snapshot()["counters"]
+    return results
+
+
+def check_regressions(current: dict, baseline: dict, tolerance: float, min_seconds: float) -> List[str]:
+    """Stages whose calibration-normalized median grew by more than `tolerance` (0.5 = 50%)."""
+    scale = current["calibration_seconds"] / baseline["calibration_seconds"]
+    regressions = []
+    for scenario, stages in current["results"].items():
+        for stage, timing in stages.items():
+            base = baseline["results"].get(scenario, {}).get(stage)
+            if base is None or base["median_seconds"] < min_seconds:
+                continue
+            expected = base["median_seconds"] * scale
+            if timing["median_seconds"] > expected * (1 + tolerance):
+                regressions.append(f"{scenario}/{stage}: {timing['median_seconds']:.4f}s vs expected "
+                                   f"{expected:.4f}s (+{timing['median_seconds'] / expected - 1:.0%})")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run offline pipeline benchmarks against fake Gemini/Pinecone backends.")
+    parser.add_argument("--scenarios", default="small,medium", help=f"Comma-separated, from: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds added to each fake Gemini call.")
+    parser.add_argument("--upsert-latency", type=float, default=0.0, help="Seconds added to each fake upsert batch.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a fake API call fails.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--baseline", help="Compare against results saved with --save-baseline; exit 1 on regression.")
+    parser.add_argument("--save-baseline", help="Save these results as a baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown before a stage counts as regressed.")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="Ignore stages faster than this in the baseline.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output while benchmarking.")
+    args = parser.parse_args(argv)
+
+    current = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_seconds": calibrate(),
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in SCENARIOS:
+                parser.error(f"Unknown scenario: {name}")
+            print(f"Running scenario '{name}' (pages, tables/page, catalog size = {SCENARIOS[name]})...", file=sys.stderr)
+            current["results"][name] = run_scenario(name, workdir, args)
+
+    for scenario, stages in current["results"].items():
+        print(f"\n{scenario}")
+        for stage, timing in stages.items():
+            print(f"  {stage:<18} {timing['median_seconds']:>9.4f}s median {timing['min_seconds']:>9.4f}s min")
+    print(f"\ncalibration {current['calibration_seconds']:.4f}s")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check_regressions(current, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# benchmarks/synthetic.py
+import itertools
+import random
+from typing import List
+from xml.sax.saxutils import escape
+import fitz  # PyMuPDF
+
+_SENIORITY = ["", "Senior ", "Junior ", "Lead ", "Principal ", "Associate ", "Staff ", "Chief "]
+_DOMAINS = ["Software", "Data", "Cloud", "QA", "Product", "Marketing", "Finance", "Security", "Network", "Platform",
+            "Mobile", "Frontend", "Backend", "Sales", "Support", "Research", "Operations", "Compliance", "Content",
+            "Design", "Infrastructure", "Analytics", "Machine Learning", "Procurement", "Legal", "HR", "Payroll",
+            "Quality", "Release", "Database"]
+_TITLES = ["Engineer", "Manager", "Developer", "Analyst", "Scientist", "Tester", "Designer", "Director",
+           "Officer", "Architect", "Coordinator", "Specialist", "Consultant", "Administrator", "Technician"]
+_FILLER = ("The team reviewed the quarterly plan and agreed on the next milestones. "
+           "Responsibilities are shared across the department and reviewed every sprint. ")
+
+
+def role_names(count: int, seed: int = 0) -> List[str]:
+    """`count` distinct, realistic job titles in a seeded order."""
+    base = [f"{seniority}{domain} {title}" for seniority, domain, title in itertools.product(_SENIORITY, _DOMAINS, _TITLES)]
+    random.Random(seed).shuffle(base)
+    names = base[:count]
+    # Very large catalogs get numbered grades on top of the combinations
+    for grade in itertools.count(2):
+        if len(names) >= count:
+            break
+        names.extend(f"{name} {grade}" for name in base[:count - len(names)])
+    return names
+
+
+def make_catalog_xml(path: str, size: int, seed: int = 0) -> List[str]:
+    """Writes a <roles><role>...</role></roles> catalog of `size` roles and returns them."""
+    roles = role_names(size, seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<roles>\n")
+        for role in roles:
+            f.write(f"  <role>{escape(role)}</role>\n")
+        f.write("</roles>\n")
+    return roles
+
+
+def make_pdf(path: str, pages: int, catalog: List[str], tables_per_page: int = 1, rows_per_table: int = 6,
+             unknown_rate: float = 0.1, seed: int = 0) -> List[str]:
+    """
+    Writes a synthetic job-description PDF: each page has paragraphs that
+    mention roles, plus `tables_per_page` ruled "Role | Count" tables that
+    PyMuPDF's table finder detects. About `unknown_rate` of mentioned roles are
+    not in `catalog`. Returns the distinct roles mentioned, in order.
+    """
+    rng = random.Random(seed)
+    known = set(catalog)
+    unknown = [name for name in role_names(len(catalog) + 200, seed + 1) if name not in known][:200]
+
+    def pick():
+        return rng.choice(unknown) if unknown and rng.random() < unknown_rate else rng.choice(catalog)
+
+    mentioned = []
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        y = 60
+        for _ in range(3):
+            role = pick()
+            mentioned.append(role)
+            text = f"The {role} is responsible for delivery. {_FILLER}"
+            rect = fitz.Rect(50, y, 545, y + 70)
+            page.insert_textbox(rect, text, fontsize=9)
+            y += 80
+        for _ in range(tables_per_page):
+            if y + (rows_per_table + 1) * 16 > 800:
+                break
+            rows = [("Role", "Count")] + [(pick(), str(rng.randint(1, 9))) for _ in range(rows_per_table)]
+            mentioned.extend(role for role, _ in rows[1:])
+            for i, (role, count) in enumerate(rows):
+                top = y + i * 16
+                page.draw_rect(fitz.Rect(50, top, 400, top + 16), color=(0, 0, 0), width=0.5)
+                page.draw_rect(fitz.Rect(400, top, 480, top + 16), color=(0, 0, 0), width=0.5)
+                page.insert_text((54, top + 11), role, fontsize=8)
+                page.insert_text((404, top + 11), count, fontsize=8)
+            y += (rows_per_table + 1) * 16 + 20
+    document.save(path)
+    document.close()
+    return list(dict.fromkeys(mentioned))
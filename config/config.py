@@ -1,25 +1,131 @@
 # config/config.py
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _tokens_setting(name: str, deprecated_chars_name: str, default: int) -> int:
+    """Reads a token-count setting, converting its deprecated character-count predecessor (~4 characters per token)."""
+    if os.getenv(name) is not None:
+        return int(os.getenv(name))
+    chars = os.getenv(deprecated_chars_name)
+    if chars is None:
+        return default
+    tokens = round(int(chars) / 4)
+    logging.getLogger(__name__).warning("%s is deprecated (characters); use %s (tokens). Using %s=%d.",
+                                        deprecated_chars_name, name, name, tokens)
+    return tokens
+
+
 # Google Gemini API Key
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # Pinecone API Key and Index Name
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "role-comparison-index") # Default name if not set in .env
+# Delete and recreate the index before each run. Off by default: the index is long-lived
+# and every document is isolated in its own namespace.
+PINECONE_RESET_INDEX = os.getenv("PINECONE_RESET_INDEX", "false").lower() in ("1", "true", "yes")
+# Upserts are sent in batches over a bounded pool of concurrent requests, each batch
+# retried with exponential backoff (PINECONE_UPSERT_BACKOFF seconds, doubling per attempt)
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", 100))
+PINECONE_UPSERT_WORKERS = int(os.getenv("PINECONE_UPSERT_WORKERS", 4))
+PINECONE_UPSERT_MAX_RETRIES = int(os.getenv("PINECONE_UPSERT_MAX_RETRIES", 3))
+PINECONE_UPSERT_BACKOFF = float(os.getenv("PINECONE_UPSERT_BACKOFF", 1.0))
+# Vector store backend: "pinecone" (remote index) or "local" (in-process NumPy store).
+# The local store persists to LOCAL_VECTOR_STORE_PATH; set it to "" to keep vectors in memory only.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(".cache", "vectors"))
 
 # Other configurations
-PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", 1000))
-PDF_CHUNK_OVERLAP = int(os.getenv("PDF_CHUNK_OVERLAP", 100))
+# Log level for diagnostic output (DEBUG also dumps the full extracted text of every PDF)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# If set, stage timings and counters are written here at the end of a run
+# (Prometheus text format for .prom/.txt files, JSON otherwise)
+METRICS_REPORT_PATH = os.getenv("METRICS_REPORT_PATH", "")
+# Embedding chunks are packed from whole text blocks and table rows up to this many estimated
+# tokens (~4 characters each), repeating up to PDF_CHUNK_OVERLAP_TOKENS of trailing context
+# (the old character-based PDF_CHUNK_SIZE / PDF_CHUNK_OVERLAP are still read, with a warning)
+PDF_CHUNK_TOKENS = max(1, _tokens_setting("PDF_CHUNK_TOKENS", "PDF_CHUNK_SIZE", 250))
+PDF_CHUNK_OVERLAP_TOKENS = _tokens_setting("PDF_CHUNK_OVERLAP_TOKENS", "PDF_CHUNK_OVERLAP", 25)
+# Chunk text is kept in a local SQLite store keyed by vector ID, and vectors only carry small
+# metadata fields; set CHUNK_STORE_PATH="" to store the text in vector metadata instead
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", os.path.join(".cache", "chunks.sqlite"))
+# Chunks retrieved per RAG query
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", 5))
+# Process pool size for page-level PDF extraction (1 = extract serially in-process)
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", 1))
+# process_pdf streams documents with at least this many pages (0 = never): pages are read
+# (by the PDF_EXTRACTION_WORKERS pool), chunked, embedded and upserted batch by batch, with at most
+# PDF_STREAMING_MAX_INFLIGHT upsert batches outstanding, so memory stays flat however long the document is
+PDF_STREAMING_MIN_PAGES = int(os.getenv("PDF_STREAMING_MIN_PAGES", 300))
+PDF_STREAMING_MAX_INFLIGHT = int(os.getenv("PDF_STREAMING_MAX_INFLIGHT", 4))
+# PDF extractions kept in memory per extractor, so indexing and role extraction reuse one pass;
+# the batch CLI, service and app raise it to cover the documents they have in flight
+PDF_EXTRACTION_CACHE_SIZE = int(os.getenv("PDF_EXTRACTION_CACHE_SIZE", 8))
+# Number of consecutive pages handed to each extraction worker task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+# Embedding model and how many texts are sent per embed_content request (the API accepts up to 100)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+# On-disk embedding cache keyed by (model, chunk text hash); set EMBEDDING_CACHE_PATH="" to disable
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
+# Gemini quotas, shared by every client in the process (0 = unlimited). Retryable errors
+# (429, 5xx, timeouts) are retried with exponential backoff and jitter, up to GEMINI_MAX_RETRIES times.
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 1000))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", 4000000))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", 1500))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 0))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 5))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 1.0))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", 60.0))
 ROLE_EXTRACTION_PROMPT = os.getenv(
     "ROLE_EXTRACTION_PROMPT",
     "List all the job roles or titles mentioned in the following document. "
     "Provide a comma-separated list of unique roles. If no roles are found, respond with 'None'."
 )
+# Map-reduce role extraction: documents are split into segments of at most this many
+# estimated tokens, which are sent to the LLM concurrently by ROLE_EXTRACTION_WORKERS threads
+ROLE_EXTRACTION_SEGMENT_TOKENS = int(os.getenv("ROLE_EXTRACTION_SEGMENT_TOKENS", 30000))
+ROLE_EXTRACTION_WORKERS = int(os.getenv("ROLE_EXTRACTION_WORKERS", 4))
+# On-disk cache of parsed role-extraction results; set ROLE_CACHE_PATH="" to disable
+ROLE_CACHE_PATH = os.getenv("ROLE_CACHE_PATH", os.path.join(".cache", "roles.sqlite"))
+ROLE_CACHE_MAX_ENTRIES = int(os.getenv("ROLE_CACHE_MAX_ENTRIES", 100000))
+# Cached role results expire after this many seconds (0 = never); ROLE_CACHE_BYPASS=true ignores
+# cached results and re-queries the LLM (fresh results are still written back)
+ROLE_CACHE_TTL_SECONDS = float(os.getenv("ROLE_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+ROLE_CACHE_BYPASS = os.getenv("ROLE_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+# Deterministic pre-pass: catalog roles found verbatim in the document are taken as-is, and only
+# sentences and table rows with capitalized words the catalog doesn't explain are sent to the LLM
+ROLE_PREPASS = os.getenv("ROLE_PREPASS", "true").lower() in ("1", "true", "yes")
 FUZZY_MATCH_THRESHOLD = int(os.getenv("FUZZY_MATCH_THRESHOLD", 80))
+# Threads used for batched fuzzy matching (-1 = all cores)
+FUZZY_MATCH_WORKERS = int(os.getenv("FUZZY_MATCH_WORKERS", -1))
+# Catalog roles scored per fuzzy lookup after n-gram candidate blocking (smaller catalogs are scored in full)
+ROLE_CATALOG_CANDIDATES = int(os.getenv("ROLE_CATALOG_CANDIDATES", 50))
+# Documents validated concurrently by the batch CLI (python -m src.batch)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+# Background validation jobs (Streamlit app): worker threads, and finished jobs kept for polling
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", 200))
+# HTTP validation service (python -m src.service). SERVICE_WORKERS documents are validated
+# concurrently (0 = one per core, capped by the Gemini request quota); once SERVICE_MAX_PENDING
+# jobs are queued or running, new submissions are rejected with 503 until the queue drains
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", 8080))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", 0))
+SERVICE_MAX_PENDING = int(os.getenv("SERVICE_MAX_PENDING", 64))
+SERVICE_MAX_UPLOAD_MB = float(os.getenv("SERVICE_MAX_UPLOAD_MB", 100))
+# XML catalogs uploaded to the service, kept parsed in memory (least recently used are dropped)
+SERVICE_CATALOG_CACHE_SIZE = int(os.getenv("SERVICE_CATALOG_CACHE_SIZE", 32))
+# Per-service concurrency limits for the asyncio pipeline (python -m src.batch --async)
+ASYNC_LLM_CONCURRENCY = int(os.getenv("ASYNC_LLM_CONCURRENCY", 8))
+ASYNC_EMBED_CONCURRENCY = int(os.getenv("ASYNC_EMBED_CONCURRENCY", 8))
+ASYNC_VECTOR_CONCURRENCY = int(os.getenv("ASYNC_VECTOR_CONCURRENCY", 16))
+ASYNC_EXTRACT_CONCURRENCY = int(os.getenv("ASYNC_EXTRACT_CONCURRENCY", os.cpu_count() or 1))
 
 # --- IMPORTANT ---
 # Create a .env file in the ROOT of your project (same level as 'src' and 'config' folders)
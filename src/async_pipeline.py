@@ -0,0 +1,105 @@
+# src/async_pipeline.py
+import asyncio
+import threading
+from typing import AsyncIterator, Iterable
+from src.pdf_extractor_rag import RAGPDFExtractor
+from src.pipeline import document_result, record_comparison
+from src.role_catalog import RoleCatalog
+from src.role_comparer import RoleComparer
+from src.vector_store import UpsertSummary
+from config.config import (FUZZY_MATCH_THRESHOLD, ASYNC_LLM_CONCURRENCY, ASYNC_EMBED_CONCURRENCY,
+                           ASYNC_VECTOR_CONCURRENCY, ASYNC_EXTRACT_CONCURRENCY)
+
+class AsyncValidationPipeline:
+    """
+    Validates many PDFs on one event loop. For each document, indexing
+    (embedding batches, upserts) and LLM role extraction run concurrently, and
+    calls from all documents overlap. Each external service gets its own
+    semaphore. Gemini generate calls are made from the extractor's
+    role-extraction threads, so their limit is a thread semaphore held around
+    each call; in-flight generate calls never exceed `llm_concurrency` however
+    many documents (and segments per document) are in progress.
+    Produces the same result dicts as pipeline.validate_document.
+    """
+
+    def __init__(self, pdf_extractor: RAGPDFExtractor, catalog: RoleCatalog, comparer: RoleComparer = None,
+                 llm_concurrency: int = ASYNC_LLM_CONCURRENCY, embed_concurrency: int = ASYNC_EMBED_CONCURRENCY,
+                 vector_concurrency: int = ASYNC_VECTOR_CONCURRENCY, extract_concurrency: int = ASYNC_EXTRACT_CONCURRENCY):
+        self.pdf_extractor = pdf_extractor
+        self.catalog = catalog
+        self.comparer = comparer or RoleComparer(fuzzy_threshold=FUZZY_MATCH_THRESHOLD)
+        self.llm_limit = threading.BoundedSemaphore(llm_concurrency)
+        self.embed_limit = asyncio.Semaphore(embed_concurrency)
+        self.vector_limit = asyncio.Semaphore(vector_concurrency)
+        self.extract_limit = asyncio.Semaphore(extract_concurrency)
+        # Enough worker threads to keep every semaphore slot busy at once
+        self.thread_count = llm_concurrency + embed_concurrency + vector_concurrency + extract_concurrency
+
+    async def index(self, pdf_path: str, pdf_id: str):
+        """Async counterpart of RAGPDFExtractor.process_pdf; embedding batches are sent concurrently."""
+        async with self.vector_limit:
+            plan = await asyncio.to_thread(self.pdf_extractor.plan_index, pdf_path, pdf_id)
+        if plan is None:
+            return None
+
+        gemini_client = self.pdf_extractor.gemini_client
+        texts = plan.new_chunks
+        batch_size = gemini_client.embedding_batch_size
+
+        async def embed(batch):
+            async with self.embed_limit:
+                return await gemini_client.aembed_texts(batch)
+
+        batches = await asyncio.gather(*(embed(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)))
+        vectors_to_upsert = plan.vectors([embedding for batch in batches for embedding in batch])
+
+        store = self.pdf_extractor.vector_store
+        summary = UpsertSummary()
+        async with self.vector_limit:
+            if vectors_to_upsert:
+                summary = await store.aupsert_vectors(vectors_to_upsert, namespace=pdf_id)
+            if plan.stale_ids:
+                await store.adelete_ids(plan.stale_ids, namespace=pdf_id)
+            await asyncio.to_thread(store.persist)
+        plan.report(pdf_path, summary)
+        return summary
+
+    async def extract_roles(self, pdf_path: str) -> list:
+        # The LLM limit is taken per generate call, so cache hits and the catalog pre-pass never hold a slot
+        return await asyncio.to_thread(self.pdf_extractor.extract_roles_from_pdf, pdf_path,
+                                       catalog=self.catalog, llm_limit=self.llm_limit)
+
+    async def validate(self, pdf_path: str, pdf_id: str = None, index: bool = True) -> dict:
+        """Validates one PDF; never raises (failures are reported with status "error")."""
+        with document_result(pdf_path, pdf_id) as result:
+            # Extraction is CPU-bound and cached (pinned) on the extractor, so later stages reuse it
+            with self.pdf_extractor.pinned(pdf_path):
+                async with self.extract_limit:
+                    await asyncio.to_thread(self.pdf_extractor.extract, pdf_path)
+                if pdf_id is None:
+                    # Hashing reads the whole file, so it runs off the event loop like the other blocking calls
+                    pdf_id = result["pdf_id"] = await asyncio.to_thread(self.pdf_extractor.document_id, pdf_path)
+
+                if index:
+                    summary, pdf_roles = await asyncio.gather(self.index(pdf_path, pdf_id), self.extract_roles(pdf_path))
+                    if summary is not None:
+                        result["vectors_failed"] = summary.failed
+                else:
+                    pdf_roles = await self.extract_roles(pdf_path)
+
+            record_comparison(result, self.comparer, self.catalog, pdf_roles)
+        return result
+
+    async def validate_many(self, pdf_paths: Iterable[str], max_in_flight: int = 32, index: bool = True) -> AsyncIterator[dict]:
+        """Yields results as documents finish, keeping at most `max_in_flight` documents in progress."""
+        pending = set()
+        for pdf_path in pdf_paths:
+            if len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.create_task(self.validate(pdf_path, index=index)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
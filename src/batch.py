@@ -0,0 +1,177 @@
+# src/batch.py
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List
+from src.async_pipeline import AsyncValidationPipeline
+from src.pdf_extractor_rag import RAGPDFExtractor
+from src.metrics import metrics
+from src.pipeline import validate_document
+from src.role_catalog import RoleCatalog
+from src.role_comparer import RoleComparer
+from config.config import BATCH_WORKERS, FUZZY_MATCH_THRESHOLD, LOG_LEVEL, METRICS_REPORT_PATH
+
+REPORT_FIELDS = ["pdf_path", "pdf_id", "status", "is_incorrect", "matched_roles", "incorrect_pdf_roles",
+                 "pdf_roles", "vectors_failed", "error", "elapsed_seconds"]
+
+def iter_pdf_paths(source: str) -> Iterator[str]:
+    """
+    Yields the PDFs to validate: every *.pdf under a directory (sorted), a single
+    PDF, or the paths listed in a manifest file (one per line, relative to the
+    manifest; blank lines and '#' comments are ignored).
+    """
+    if os.path.isdir(source):
+        for root, _, files in sorted(os.walk(source)):
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    yield os.path.join(root, name)
+    elif source.lower().endswith(".pdf"):
+        yield source
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line if os.path.isabs(line) else os.path.join(base_dir, line)
+
+def load_catalog(path: str, role_xpath: str) -> RoleCatalog:
+    """Loads a saved RoleCatalog (.json) or builds one from an XML file."""
+    if path.lower().endswith(".json"):
+        return RoleCatalog.load(path)
+    return RoleCatalog.from_xml(path, role_xpath)
+
+class ReportWriter:
+    """Writes one report row per document as JSONL or CSV, flushing after each row."""
+
+    def __init__(self, output, fmt: str):
+        self.output = output
+        self.fmt = fmt
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(output, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, result: dict):
+        if self._csv:
+            row = {key: (";".join(value) if isinstance(value, list) else value) for key, value in result.items()}
+            self._csv.writerow(row)
+        else:
+            self.output.write(json.dumps(result) + "\n")
+        self.output.flush()
+
+def run_batch(pdf_paths, catalog: RoleCatalog, writer: ReportWriter, workers: int = BATCH_WORKERS,
+              index: bool = True, pdf_extractor: RAGPDFExtractor = None) -> dict:
+    """
+    Validates every PDF against one catalog with at most `workers` documents in
+    flight, sharing one set of clients. Rows are written as documents finish.
+    Returns counts of ok, incorrect and errored documents.
+    """
+    pdf_extractor = pdf_extractor or RAGPDFExtractor(extraction_cache_size=workers * 2)
+    comparer = RoleComparer(fuzzy_threshold=FUZZY_MATCH_THRESHOLD)
+    counts = {"documents": 0, "ok": 0, "incorrect": 0, "error": 0}
+    pending = set()
+
+    def collect(done):
+        for future in done:
+            result = future.result()
+            writer.write(result)
+            counts["documents"] += 1
+            if result["status"] == "error":
+                counts["error"] += 1
+            elif result["is_incorrect"]:
+                counts["incorrect"] += 1
+            else:
+                counts["ok"] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for pdf_path in pdf_paths:
+            # Bounded submission: never hold more than 2x workers documents in the queue
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(validate_document, pdf_extractor, catalog, comparer, pdf_path, index=index))
+        collect(wait(pending).done)
+    return counts
+
+def run_batch_async(pdf_paths, catalog: RoleCatalog, writer: ReportWriter, max_in_flight: int = BATCH_WORKERS,
+                    index: bool = True, pdf_extractor: RAGPDFExtractor = None) -> dict:
+    """
+    Like run_batch, but drives all documents from one asyncio event loop
+    (AsyncValidationPipeline), with per-service concurrency limits from config.
+    """
+    pipeline = AsyncValidationPipeline(pdf_extractor or RAGPDFExtractor(extraction_cache_size=max_in_flight * 2), catalog)
+    counts = {"documents": 0, "ok": 0, "incorrect": 0, "error": 0}
+
+    async def drive():
+        # Blocking SDK calls run in the loop's default executor; size it to the semaphore limits, plus one
+        # role-extraction thread per document in flight (those wait on the LLM limit inside the thread)
+        executor = ThreadPoolExecutor(max_workers=pipeline.thread_count + max_in_flight)
+        asyncio.get_running_loop().set_default_executor(executor)
+        async for result in pipeline.validate_many(pdf_paths, max_in_flight=max_in_flight, index=index):
+            writer.write(result)
+            counts["documents"] += 1
+            if result["status"] == "error":
+                counts["error"] += 1
+            elif result["is_incorrect"]:
+                counts["incorrect"] += 1
+            else:
+                counts["ok"] += 1
+
+    asyncio.run(drive())
+    return counts
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate a directory or manifest of PDFs against one XML role catalog.")
+    parser.add_argument("--input", required=True, help="Directory of PDFs, a single PDF, or a manifest file listing PDF paths.")
+    parser.add_argument("--xml", required=True, help="XML role catalog, or a RoleCatalog saved as .json.")
+    parser.add_argument("--xpath", default="//role/text()", help="XPath selecting role names in the XML.")
+    parser.add_argument("--output", default="validation_report.jsonl", help="Report path (.jsonl or .csv); '-' writes to stdout.")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Report format (default: from the output extension).")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Documents processed concurrently.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run documents on one asyncio event loop; --workers then caps documents in flight.")
+    parser.add_argument("--skip-index", action="store_true", help="Don't index chunks into the vector store (role extraction only).")
+    parser.add_argument("--refresh-roles", action="store_true",
+                        help="Ignore cached role-extraction results and re-query the LLM.")
+    parser.add_argument("--metrics", default=METRICS_REPORT_PATH,
+                        help="Write stage timings and counters here (.prom/.txt for Prometheus text, JSON otherwise).")
+    parser.add_argument("--save-catalog", metavar="PATH",
+                        help="Also save the loaded catalog as JSON here, for later runs and the service to load with --xml.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=LOG_LEVEL)
+    # Anything that isn't a directory or a .pdf is read as a manifest, so a typo would otherwise surface as a traceback
+    for option, path in (("--input", args.input), ("--xml", args.xml)):
+        if not os.path.exists(path):
+            parser.error(f"{option} {path!r} does not exist")
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    catalog = load_catalog(args.xml, args.xpath)
+    if not len(catalog):
+        print("Warning: No roles extracted from XML. Please check XML file and XPath.", file=sys.stderr)
+    if args.save_catalog:
+        catalog.save(args.save_catalog)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        runner = run_batch_async if args.use_async else run_batch
+        pdf_extractor = RAGPDFExtractor(bypass_role_cache=True, extraction_cache_size=max(1, args.workers) * 2) if args.refresh_roles else None
+        counts = runner(iter_pdf_paths(args.input), catalog, ReportWriter(output, fmt),
+                        max(1, args.workers), index=not args.skip_index, pdf_extractor=pdf_extractor)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Validated {counts['documents']} documents: {counts['ok']} correct, "
+          f"{counts['incorrect']} incorrect, {counts['error']} failed.", file=sys.stderr)
+    print(metrics.summary(), file=sys.stderr)
+    if args.metrics:
+        metrics.write_report(args.metrics)
+    return 1 if counts["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# src/chunk_store.py
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 900
+
+
+class ChunkStore:
+    """
+    Local store of chunk text keyed by vector ID, so vector metadata only has
+    to carry small fields (pdf_id, chunk_index). Chunk IDs are content hashes,
+    so the text stored under an ID never changes; retrieved chunks are fetched
+    in bulk with get_many. Use ":memory:" as `db_path` for a throwaway store.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY,"
+            " pdf_id TEXT NOT NULL,"
+            " text TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_pdf_id ON chunks (pdf_id)")
+        self._conn.commit()
+
+    def put_many(self, pdf_id: str, chunks: Iterable[Tuple[str, str]]):
+        """Stores (vector_id, text) pairs for one document; IDs already stored are left as they are."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (id, pdf_id, text) VALUES (?, ?, ?)",
+                ((vector_id, pdf_id, text) for vector_id, text in chunks),
+            )
+            self._conn.commit()
+
+    def get_many(self, ids: List[str]) -> Dict[str, str]:
+        """Returns {vector_id: text} for the IDs that are stored."""
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", batch))
+        return found
+
+    def retain(self, pdf_id: str, keep_ids: Iterable[str]) -> int:
+        """Deletes the document's chunks whose ID is not in `keep_ids`; returns how many were deleted."""
+        keep_ids = set(keep_ids)
+        with self._lock:
+            stale = [(vector_id,) for (vector_id,) in self._conn.execute("SELECT id FROM chunks WHERE pdf_id = ?", (pdf_id,))
+                     if vector_id not in keep_ids]
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", stale)
+            self._conn.commit()
+        return len(stale)
+
+    def delete_document(self, pdf_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE pdf_id = ?", (pdf_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
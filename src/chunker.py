@@ -0,0 +1,131 @@
+# src/chunker.py
+import re
+from typing import Iterable, Iterator, List, Tuple
+from src.utils import estimate_tokens
+from config.config import PDF_CHUNK_TOKENS, PDF_CHUNK_OVERLAP_TOKENS
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+|\n+")
+TABLE_START = "--- DATA TABLE WITH ROLES AND COUNTS ---"
+TABLE_END = "--- END OF TABLE DATA ---"
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text at sentence and line ends, dropping empty pieces."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def table_rows(unit: str) -> List[str]:
+    """The rows of a table unit made by format_table (empty for any other unit)."""
+    unit = unit.strip()
+    if not (unit.startswith(TABLE_START) and unit.endswith(TABLE_END)):
+        return []
+    return [row for row in unit[len(TABLE_START):-len(TABLE_END)].splitlines() if row.strip()]
+
+
+def format_table(rows: List[str]) -> str:
+    """Wraps the rows of one extracted table in the markers the LLM prompt relies on."""
+    table_str = "\n".join(rows)
+    return f"\n{TABLE_START}\n{table_str.strip()}\n{TABLE_END}"
+
+
+def iter_text_units(page_blocks: List[List[str]], page_tables: List[List[List[str]]]) -> Iterator[str]:
+    """Yields text blocks and formatted tables in document order (each page's blocks, then its tables)."""
+    for blocks, tables in zip(page_blocks, page_tables):
+        yield from blocks
+        for rows in tables:
+            yield format_table(rows)
+
+
+def _split_words(text: str, max_tokens: int) -> Iterator[str]:
+    """Splits text on whitespace into pieces within budget; only a single oversize word is cut."""
+    max_chars = max(1, max_tokens * 4 - 1)
+    piece = ""
+    for word in text.split():
+        while len(word) > max_chars:
+            if piece:
+                yield piece
+                piece = ""
+            yield word[:max_chars]
+            word = word[max_chars:]
+        if piece and estimate_tokens(f"{piece} {word}") > max_tokens:
+            yield piece
+            piece = word
+        else:
+            piece = f"{piece} {word}" if piece else word
+    if piece:
+        yield piece
+
+
+def _split_block(block: str, max_tokens: int) -> Iterator[str]:
+    """Splits an oversize text block at sentence and line ends, falling back to word boundaries."""
+    for sentence in split_sentences(block):
+        if estimate_tokens(sentence) > max_tokens:
+            yield from _split_words(sentence, max_tokens)
+        else:
+            yield sentence
+
+
+def _split_table(rows: List[str], max_tokens: int) -> Iterator[str]:
+    """Splits an oversize table into row groups, each with the table markers and the header row repeated."""
+    rows = [row for row in rows if row.strip()]
+    if not rows:
+        return
+    header, body = rows[0], rows[1:]
+    group: List[str] = []
+    for row in body:
+        if group and estimate_tokens(format_table([header] + group + [row])) > max_tokens:
+            yield format_table([header] + group)
+            group = []
+        group.append(row)
+    yield format_table([header] + group)
+
+
+def iter_chunks(page_blocks: List[List[str]], page_tables: List[List[List[str]]],
+                max_tokens: int = PDF_CHUNK_TOKENS, overlap_tokens: int = PDF_CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """Chunks an extracted document; see iter_page_chunks."""
+    return iter_page_chunks(zip(page_blocks, page_tables), max_tokens, overlap_tokens)
+
+
+def iter_page_chunks(pages: Iterable[Tuple[List[str], List[List[str]]]],
+                     max_tokens: int = PDF_CHUNK_TOKENS, overlap_tokens: int = PDF_CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """
+    Streams embedding chunks of at most about `max_tokens` estimated tokens,
+    packed from whole text blocks and table rows in document order. A block is
+    only split (at sentence ends, then between words) when it alone exceeds the
+    budget, and a table only between rows, so chunks never cut through a word,
+    a table row or a role name. Each chunk repeats trailing whole units of the
+    previous one, up to `overlap_tokens`, for context across the boundary.
+    `pages` is consumed lazily, one (blocks, tables) page at a time.
+    """
+    max_tokens = max(1, max_tokens)
+    current: List[str] = []
+    current_tokens = 0
+    for blocks, tables in pages:
+        units = []
+        for block in blocks:
+            block = block.strip()
+            if not block:
+                continue
+            units.extend(_split_block(block, max_tokens) if estimate_tokens(block) > max_tokens else [block])
+        for rows in tables:
+            table = format_table(rows)
+            units.extend(_split_table(rows, max_tokens) if estimate_tokens(table) > max_tokens else [table])
+
+        for unit in units:
+            unit_tokens = estimate_tokens(unit)
+            if current and current_tokens + unit_tokens > max_tokens:
+                yield "\n\n".join(current)
+                # Carry trailing units forward as overlap, as long as they fit next to the new unit
+                overlap: List[str] = []
+                overlap_total = 0
+                for previous in reversed(current):
+                    previous_tokens = estimate_tokens(previous)
+                    if overlap_total + previous_tokens > overlap_tokens or overlap_total + previous_tokens + unit_tokens > max_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_total += previous_tokens
+                current, current_tokens = overlap, overlap_total
+            current.append(unit)
+            current_tokens += unit_tokens
+    if current:
+        yield "\n\n".join(current)
@@ -1,58 +1,188 @@
 # src/gemini_client.py
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from config.config import GOOGLE_API_KEY
+import asyncio
+import threading
+from typing import List
+from config.config import (GOOGLE_API_KEY, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+                           GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE, EMBEDDING_REQUESTS_PER_MINUTE,
+                           EMBEDDING_TOKENS_PER_MINUTE, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX)
+from src.embedding_cache import EmbeddingCache
+from src.metrics import metrics
+from src.utils import estimate_tokens
+from src.rate_limiter import (RequestScheduler, get_scheduler, is_rate_limit_error,
+                              PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _load_genai():
+    """
+    Imports and configures the Gemini SDK on first use. Importing it takes
+    seconds, so code paths that never call Gemini don't pay for it.
+    """
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GOOGLE_API_KEY)
+            _genai = genai
+    return _genai
+
+
+class GeminiError(Exception):
+    """A Gemini call failed; distinct from a successful call that found nothing."""
+
+
+class GeminiRateLimitError(GeminiError):
+    """The Gemini quota was still exhausted after all retries."""
+
+
+def _as_gemini_error(error: Exception, context: str) -> GeminiError:
+    if isinstance(error, GeminiError):
+        return error
+    error_class = GeminiRateLimitError if is_rate_limit_error(error) else GeminiError
+    return error_class(f"{context}: {type(error).__name__}: {error}")
 
-genai.configure(api_key=GOOGLE_API_KEY)
 
 class GeminiClient:
-    def __init__(self, model_name="gemini-1.5-flash"):
-        # Configure safety settings for Gemini-pro model
-        self.model = genai.GenerativeModel(
-            model_name,
-            safety_settings=[
-                {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-            ]
-        )
+    def __init__(self, model_name="gemini-1.5-flash", embedding_model=EMBEDDING_MODEL, embedding_batch_size=EMBEDDING_BATCH_SIZE, embedding_cache=None,
+                 generate_scheduler: RequestScheduler = None, embed_scheduler: RequestScheduler = None,
+                 model=None, embed_content=None):
+        self.model_name = model_name
+        self.embedding_model = embedding_model
+        self.embedding_batch_size = max(1, embedding_batch_size)
+        # Embeddings are looked up in the on-disk cache before calling the API (disabled if EMBEDDING_CACHE_PATH is empty)
+        if embedding_cache is None and EMBEDDING_CACHE_PATH:
+            embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        self.embedding_cache = embedding_cache
+        # Rate limiting and retries are shared by every client in the process, so the quota is shared too
+        self.generate_scheduler = generate_scheduler or get_scheduler(
+            "generate", requests_per_minute=GEMINI_REQUESTS_PER_MINUTE, tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+            max_retries=GEMINI_MAX_RETRIES, backoff_base=GEMINI_BACKOFF_BASE, backoff_max=GEMINI_BACKOFF_MAX)
+        self.embed_scheduler = embed_scheduler or get_scheduler(
+            "embed", requests_per_minute=EMBEDDING_REQUESTS_PER_MINUTE, tokens_per_minute=EMBEDDING_TOKENS_PER_MINUTE,
+            max_retries=GEMINI_MAX_RETRIES, backoff_base=GEMINI_BACKOFF_BASE, backoff_max=GEMINI_BACKOFF_MAX)
+        # The model and embed function are created from the SDK on first use (see the properties below)
+        # unless stand-ins are passed: any object with generate_content() and an embed_content(model=, content=) function
+        self._model = model
+        self._embed_content_fn = embed_content
+
+    @property
+    def model(self):
+        if self._model is None:
+            genai = _load_genai()
+            from google.generativeai.types import HarmCategory, HarmBlockThreshold
+            # Configure safety settings for Gemini-pro model
+            self._model = genai.GenerativeModel(
+                self.model_name,
+                safety_settings=[
+                    {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                    {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                    {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                    {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                ]
+            )
+        return self._model
+
+    @property
+    def _embed_content(self):
         # No need to instantiate EmbeddingModel directly here, use genai.embed_content directly in the method.
-        # self.embedding_model = genai.EmbeddingModel("models/embedding-001") # This line is NOT needed
+        if self._embed_content_fn is None:
+            self._embed_content_fn = _load_genai().embed_content
+        return self._embed_content_fn
 
-    def generate_text(self, prompt: str) -> str:
-        """Generates text using the Gemini model."""
+    def generate_text(self, prompt: str, priority: int = PRIORITY_NORMAL) -> str:
+        """
+        Generates text using the Gemini model, through the shared rate-limited scheduler.
+        Raises GeminiRateLimitError if the quota is still exhausted after retries, and
+        GeminiError for any other failure (including responses with no candidates
+        or no text), so a failed call can never be mistaken for an empty answer.
+        """
+        metrics.incr("gemini_generate_calls")
+        metrics.incr("llm_prompt_tokens", estimate_tokens(prompt))
+        metrics.incr("llm_prompt_bytes", len(prompt.encode("utf-8")))
         try:
-            response = self.model.generate_content(prompt)
-            if response.candidates:
-                return response.text
-            else:
-                print("Gemini API returned no candidates.")
-                return ""
+            with metrics.span("llm_generate"):
+                response = self.generate_scheduler.call(
+                    self.model.generate_content, prompt, tokens=estimate_tokens(prompt), priority=priority
+                )
         except Exception as e:
-            print(f"Error generating text with Gemini: {e}")
-            return ""
+            metrics.incr("gemini_generate_errors")
+            raise _as_gemini_error(e, "Error generating text with Gemini") from e
+        if not response.candidates:
+            metrics.incr("gemini_generate_errors")
+            raise GeminiError("Gemini API returned no candidates (the prompt may have been blocked).")
+        try:
+            # The SDK raises ValueError from .text when a candidate has no parts (e.g. finish_reason SAFETY)
+            text = response.text
+        except ValueError as e:
+            metrics.incr("gemini_generate_errors")
+            raise GeminiError(f"Gemini API returned a candidate without text: {e}") from e
+        metrics.incr("llm_response_bytes", len(text.encode("utf-8")))
+        return text
 
-    def embed_text(self, text: str) -> list:
+    def embed_text(self, text: str, priority: int = PRIORITY_HIGH) -> list:
         """Generates embeddings for the given text using Google's embedding model."""
+        return self.embed_texts([text], priority=priority)[0]
+
+    def embed_texts(self, texts: List[str], priority: int = PRIORITY_LOW) -> List[list]:
+        """
+        Generates embeddings for many texts, packing up to `embedding_batch_size`
+        texts into each embed_content request.
+        Returns one embedding per input text, in input order. Cached embeddings are
+        reused and only the missing texts are sent to the API. Raises GeminiError
+        if a batch fails after retries.
+        """
+        known = self.embedding_cache.get_many(self.embedding_model, texts) if self.embedding_cache else {}
+        # Each distinct uncached text is embedded once, even if it repeats in the input
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+        metrics.incr("embedding_cache_hits", len(texts) - len(missing))
+        metrics.incr("embedding_cache_misses", len(missing))
+        fresh = {}
+        try:
+            for start in range(0, len(missing), self.embedding_batch_size):
+                batch = missing[start:start + self.embedding_batch_size]
+                fresh.update(zip(batch, self._embed_batch(batch, priority)))
+        finally:
+            # Keep whatever was embedded before a failure, so a retry only re-sends the rest
+            if self.embedding_cache and fresh:
+                self.embedding_cache.put_many(self.embedding_model, fresh)
+        known.update(fresh)
+        return [known[text] for text in texts]
+
+    def _embed_batch(self, batch: List[str], priority: int = PRIORITY_LOW) -> List[list]:
+        """Embeds one batch of texts with a single embed_content call."""
+        tokens = sum(estimate_tokens(text) for text in batch)
+        metrics.incr("gemini_embed_calls")
+        metrics.incr("embed_texts", len(batch))
+        metrics.incr("embed_tokens", tokens)
         try:
             # Call embed_content directly from the genai module, specifying the model
-            response = genai.embed_content(model="models/embedding-001", content=[text])
-            if response and 'embedding' in response:
-                # Ensure the embedding is a flat list of floats
-                # It should already be, but this will enforce it if there's any nesting
-                embedding = response['embedding']
-                if isinstance(embedding, list) and all(isinstance(x, (float, int)) for x in embedding):
-                    return embedding
-                elif isinstance(embedding, list) and len(embedding) == 1 and isinstance(embedding[0], list):
-                    # If it's a list containing a single list (e.g., [[...]]), flatten it
-                    return embedding[0]
-                else:
-                    print(f"Unexpected embedding format: {type(embedding)} - {embedding}")
-                    return []
-            else:
-                print("Gemini Embedding API returned no embedding.")
-                return []
+            with metrics.span("embed_request"):
+                response = self.embed_scheduler.call(
+                    self._embed_content, model=self.embedding_model, content=batch, tokens=tokens, priority=priority,
+                )
         except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return []
\ No newline at end of file
+            metrics.incr("gemini_embed_errors")
+            raise _as_gemini_error(e, f"Error generating embeddings for batch of {len(batch)}") from e
+        if not response or 'embedding' not in response:
+            raise GeminiError("Gemini Embedding API returned no embedding.")
+        embedding = response['embedding']
+        # A batch request returns a list of embeddings, one per input text
+        if isinstance(embedding, list) and len(embedding) == len(batch) and all(isinstance(e, list) for e in embedding):
+            return embedding
+        elif len(batch) == 1 and isinstance(embedding, list) and all(isinstance(x, (float, int)) for x in embedding):
+            # Single-text requests may come back as a flat list of floats
+            return [embedding]
+        raise GeminiError(f"Unexpected embedding format for batch of {len(batch)}: {type(embedding)}")
+
+    # --- Async variants: the SDK calls run in worker threads so many requests can overlap on one event loop ---
+
+    async def agenerate_text(self, prompt: str, priority: int = PRIORITY_NORMAL) -> str:
+        return await asyncio.to_thread(self.generate_text, prompt, priority)
+
+    async def aembed_text(self, text: str, priority: int = PRIORITY_HIGH) -> list:
+        return await asyncio.to_thread(self.embed_text, text, priority)
+
+    async def aembed_texts(self, texts: List[str], priority: int = PRIORITY_LOW) -> List[list]:
+        return await asyncio.to_thread(self.embed_texts, texts, priority)
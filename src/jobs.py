@@ -0,0 +1,130 @@
+# src/jobs.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from config.config import JOB_WORKERS, JOB_HISTORY_SIZE
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised by JobManager.submit when max_pending jobs are already queued or running."""
+
+
+@dataclass
+class Job:
+    """State of one background job, updated by the worker thread and read by pollers."""
+    id: str
+    status: str = QUEUED
+    stage: str = "queued"
+    progress: float = 0.0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    dedup_key: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded pool of worker threads so callers (Streamlit
+    sessions, HTTP handlers) never block on the pipeline. Each job function
+    is called as fn(*args, progress=callback) and reports progress with
+    callback(stage, fraction); its return value becomes the job result.
+    The most recent `history_size` jobs are kept for polling.
+
+    With `max_pending`, at most that many jobs may be queued or running at
+    once; further submissions raise JobQueueFullError so callers can shed load
+    instead of queueing without bound. Submissions with the same `dedup_key`
+    as a queued, running or finished (not failed) job return that job.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history_size: int = JOB_HISTORY_SIZE, max_pending: int = 0):
+        self.history_size = history_size
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="validation-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, dedup_key: Optional[str] = None, **kwargs) -> Job:
+        with self._lock:
+            if dedup_key is not None:
+                existing = self._jobs.get(self._by_key.get(dedup_key, ""))
+                if existing is not None and existing.status != FAILED:
+                    return existing
+            if self.max_pending and self.pending >= self.max_pending:
+                raise JobQueueFullError(f"{self.pending} jobs already queued or running")
+            job = Job(id=uuid.uuid4().hex, dedup_key=dedup_key)
+            self._jobs[job.id] = job
+            if dedup_key is not None:
+                self._by_key[dedup_key] = job.id
+            self._prune()
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def find(self, dedup_key: str) -> Optional[Job]:
+        """The job last submitted with `dedup_key`, if it is still in the history."""
+        with self._lock:
+            return self._jobs.get(self._by_key.get(dedup_key, ""))
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running."""
+        return sum(1 for job in list(self._jobs.values()) if job.active)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # Drop the oldest finished jobs once the history is full; active jobs are always kept
+        excess = len(self._jobs) - self.history_size
+        for job_id in [job_id for job_id, job in self._jobs.items() if not job.active][:max(0, excess)]:
+            job = self._jobs.pop(job_id)
+            if job.dedup_key is not None and self._by_key.get(job.dedup_key) == job_id:
+                del self._by_key[job.dedup_key]
+
+    def _run(self, job: Job, fn: Callable, args: tuple, kwargs: dict):
+        def progress(stage: str, fraction: float):
+            job.stage = stage
+            job.progress = max(job.progress, min(1.0, fraction))
+
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = fn(*args, progress=progress, **kwargs)
+            job.status = DONE
+            job.stage = "done"
+            job.progress = 1.0
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            job.stage = "failed"
+        finally:
+            job.finished = time.time()
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
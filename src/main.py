@@ -1,15 +1,17 @@
 # src/main.py
+import logging
 import os
 from src.xml_parser import extract_roles_from_xml
-from src.pdf_extractor_rag import RAGPDFExtractor
+from src.pdf_extractor_rag import PDFExtractionError, RAGPDFExtractor
+from src.gemini_client import GeminiError
 from src.role_comparer import RoleComparer
-from config.config import FUZZY_MATCH_THRESHOLD
-from pinecone import Pinecone, PodSpec # Import Pinecone for optional index deletion
-from pinecone.exceptions import PineconeApiException, NotFoundException
-from config.config import PINECONE_API_KEY, PINECONE_INDEX_NAME
+from src.metrics import metrics
+from config.config import FUZZY_MATCH_THRESHOLD, LOG_LEVEL, METRICS_REPORT_PATH
+from config.config import PINECONE_API_KEY, PINECONE_INDEX_NAME, PINECONE_RESET_INDEX
 import time # For time.sleep
 
 def main():
+    logging.basicConfig(level=LOG_LEVEL)
     # --- Configuration ---
     # Path to your XML file defining correct roles
     xml_filepath = os.path.join('data', 'xml_data', 'defined_roles.xml')
@@ -62,24 +64,30 @@ def main():
     print(f"Using PDF file: {pdf_filepath}")
 
     # --- Optional: Clean Pinecone Index for a Fresh Start (especially for free tier) ---
-    # This block ensures that if an index with the same name exists, it's deleted
-    # and recreated. This can be helpful to avoid conflicts or stale data in free tiers.
-    print("\n--- Optional: Checking and preparing Pinecone index for a fresh start ---")
-    try:
-        pc_root = Pinecone(api_key=PINECONE_API_KEY)
-        if PINECONE_INDEX_NAME in pc_root.list_indexes().names():
-            print(f"Index '{PINECONE_INDEX_NAME}' already exists. Deleting for a fresh run...")
-            pc_root.delete_index(PINECONE_INDEX_NAME)
-            print(f"Index '{PINECONE_INDEX_NAME}' deleted. Waiting a few seconds for full removal...")
-            time.sleep(5) # Give Pinecone time to process deletion
-            print("Proceeding with index creation (if not already existing).")
-        else:
-            print(f"Index '{PINECONE_INDEX_NAME}' does not exist. It will be created shortly.")
-    except PineconeApiException as e:
-        print(f"Error managing Pinecone index during pre-run cleanup: {e}")
-        print("Please check your Pinecone API key and network connection. Continuing without full cleanup.")
-    except Exception as e:
-        print(f"An unexpected error occurred during Pinecone cleanup: {e}. Continuing.")
+    # The index is long-lived and each document gets its own namespace, so this is
+    # only done when PINECONE_RESET_INDEX is set. Never enable it on a shared index.
+    if PINECONE_RESET_INDEX:
+        print("\n--- Optional: Checking and preparing Pinecone index for a fresh start ---")
+        # Imported only when needed: the SDK is slow to import and unused otherwise
+        from pinecone import Pinecone
+        from pinecone.exceptions import PineconeApiException
+        try:
+            pc_root = Pinecone(api_key=PINECONE_API_KEY)
+            if PINECONE_INDEX_NAME in pc_root.list_indexes().names():
+                print(f"Index '{PINECONE_INDEX_NAME}' already exists. Deleting for a fresh run...")
+                pc_root.delete_index(PINECONE_INDEX_NAME)
+                print(f"Index '{PINECONE_INDEX_NAME}' deleted. Waiting a few seconds for full removal...")
+                time.sleep(5) # Give Pinecone time to process deletion
+                print("Proceeding with index creation (if not already existing).")
+            else:
+                print(f"Index '{PINECONE_INDEX_NAME}' does not exist. It will be created shortly.")
+        except PineconeApiException as e:
+            print(f"Error managing Pinecone index during pre-run cleanup: {e}")
+            print("Please check your Pinecone API key and network connection. Continuing without full cleanup.")
+        except Exception as e:
+            print(f"An unexpected error occurred during Pinecone cleanup: {e}. Continuing.")
+    else:
+        print(f"\nReusing Pinecone index '{PINECONE_INDEX_NAME}' (set PINECONE_RESET_INDEX=true to recreate it).")
 
 
     # --- 1. Extract roles from XML ---
@@ -94,16 +102,25 @@ def main():
     pdf_extractor = RAGPDFExtractor()
 
     # --- 3. Process the PDF and extract roles ---
-    pdf_id = "your-document-id-001" # A unique identifier for your PDF document
-    # Optional: Clear previous data for this PDF in Pinecone.
-    # This is less critical now with the optional index deletion above, but good for fine-grained control.
-    print(f"Clearing previous data for PDF ID: {pdf_id} in Pinecone (if any)...")
-    pdf_extractor.clear_pdf_data(pdf_id)
-    print(f"Processing PDF for indexing: {pdf_filepath}")
-    pdf_extractor.process_pdf(pdf_filepath, pdf_id)
-
-    print(f"\n--- Step 3: Extracting roles from PDF using Gemini LLM ---")
-    pdf_roles = pdf_extractor.extract_roles_from_pdf(pdf_filepath)
+    pdf_id = "your-document-id-001" # A unique identifier for your PDF document (also its Pinecone namespace)
+    # Indexing is incremental: unchanged chunks from a previous run are kept and
+    # stale ones removed, so there is no need to clear this PDF's data first.
+    # Use pdf_extractor.clear_pdf_data(pdf_id) to force a full re-index.
+    # Gemini failures (e.g. exhausted quota) stop the run instead of being reported as "no roles found"
+    try:
+        print(f"Processing PDF for indexing: {pdf_filepath}")
+        pdf_extractor.process_pdf(pdf_filepath, pdf_id, catalog=xml_roles)
+
+        print(f"\n--- Step 3: Extracting roles from PDF using Gemini LLM ---")
+        pdf_roles = pdf_extractor.extract_roles_from_pdf(pdf_filepath, catalog=xml_roles)
+    except GeminiError as e:
+        print(f"\nError: Gemini request failed: {e}")
+        print("--- Exiting without a report ---")
+        return
+    except PDFExtractionError as e:
+        print(f"\nError: {e}")
+        print("--- Exiting without a report ---")
+        return
     print(f"Extracted PDF Roles (via RAG): {pdf_roles}")
     if not pdf_roles:
         print("Warning: No roles extracted from PDF. This might indicate issues with PDF content or LLM extraction prompt.")
@@ -120,9 +137,14 @@ def main():
     # # Optional: Demonstrate a general query using RAG (retrieving from Pinecone and using LLM)
     # print("\n--- Optional: Testing a general query on PDF content via RAG ---")
     # general_query = "How many roles do we have in the pdf?"
-    # query_response = pdf_extractor.query_pdf_for_roles_from_pinecone(pdf_filepath, general_query)
+    # query_response = pdf_extractor.query_pdf_for_roles_from_pinecone(pdf_filepath, general_query, pdf_id=pdf_id)
     # print(f"Query: '{general_query}'")
     # print(f"RAG Response: {query_response}")
+    print("\n--- Stage timings ---")
+    print(metrics.summary())
+    if METRICS_REPORT_PATH:
+        metrics.write_report(METRICS_REPORT_PATH)
+        print(f"Metrics written to {METRICS_REPORT_PATH}")
     print("\n--- End of Process ---")
 
 
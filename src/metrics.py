@@ -0,0 +1,105 @@
+# src/metrics.py
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+class Metrics:
+    """
+    Thread-safe registry of stage timings ("spans") and counters.
+    Each span name accumulates a call count, total and maximum duration; each
+    counter a running total (API calls, bytes, tokens, cache hits, ...).
+    Snapshots can be exported as a JSON report or in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Dict[str, float]] = {}
+        self._counters: Dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str):
+        """Times the enclosed block as one call of stage `name` (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Records one call of stage `name` that took `seconds`."""
+        with self._lock:
+            span = self._spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            span["count"] += 1
+            span["total_seconds"] += seconds
+            span["max_seconds"] = max(span["max_seconds"], seconds)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def merge(self, snapshot: dict):
+        """Adds a snapshot taken elsewhere (e.g. in an extraction worker process) to this registry."""
+        with self._lock:
+            for name, other in snapshot.get("spans", {}).items():
+                span = self._spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+                span["count"] += other["count"]
+                span["total_seconds"] += other["total_seconds"]
+                span["max_seconds"] = max(span["max_seconds"], other["max_seconds"])
+            for name, value in snapshot.get("counters", {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "spans": {name: dict(span) for name, span in sorted(self._spans.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "role_validator") -> str:
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_calls_total Calls of each pipeline stage.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {span["count"]}' for name, span in snapshot["spans"].items()]
+        lines += [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {span["total_seconds"]:.6f}' for name, span in snapshot["spans"].items()]
+        lines += [
+            f"# HELP {prefix}_stage_seconds_max Longest single call of each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_max gauge",
+        ]
+        lines += [f'{prefix}_stage_seconds_max{{stage="{name}"}} {span["max_seconds"]:.6f}' for name, span in snapshot["spans"].items()]
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str):
+        """Writes the current metrics to `path`: Prometheus text for .prom/.txt files, JSON otherwise."""
+        text = self.to_prometheus() if path.lower().endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary(self) -> str:
+        """One line per stage, slowest total first, for printing at the end of a run."""
+        spans = sorted(self.snapshot()["spans"].items(), key=lambda item: -item[1]["total_seconds"])
+        return "\n".join(f"{name:<24} {span['count']:>6} calls {span['total_seconds']:>9.3f}s total "
+                         f"{span['max_seconds']:>8.3f}s max" for name, span in spans)
+
+
+# Process-wide registry used by the pipeline modules
+metrics = Metrics()
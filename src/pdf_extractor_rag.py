@@ -1,147 +1,789 @@
 # src/pdf_extractor_rag.py
-import fitz  # PyMuPDF
-from src.utils import chunk_text
-from src.gemini_client import GeminiClient
-from src.pinecone_client import PineconeClient
-from config.config import PDF_CHUNK_SIZE, PDF_CHUNK_OVERLAP, ROLE_EXTRACTION_PROMPT
-import uuid # For generating unique IDs
-from pinecone.exceptions import NotFoundException # Import the specific exception
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from src.chunker import iter_chunks, iter_page_chunks, iter_text_units
+from src.utils import normalize_role, split_into_segments
+from src.role_cache import RoleResultCache
+from src.chunk_store import ChunkStore
+from src.role_catalog import RoleCatalog
+from src.role_scanner import RoleScan, RoleScanner
+from src.gemini_client import GeminiClient, GeminiError
+from src.metrics import Metrics, metrics
+from src.rate_limiter import PRIORITY_HIGH
+from src.vector_store import UpsertSummary, create_vector_store
+from config.config import (RAG_TOP_K, ROLE_EXTRACTION_PROMPT, PDF_EXTRACTION_WORKERS, PDF_PAGES_PER_TASK,
+                           ROLE_EXTRACTION_SEGMENT_TOKENS, ROLE_EXTRACTION_WORKERS, ROLE_CACHE_PATH, ROLE_CACHE_MAX_ENTRIES,
+                           ROLE_CACHE_TTL_SECONDS, ROLE_CACHE_BYPASS, ROLE_PREPASS,
+                           PDF_STREAMING_MIN_PAGES, PDF_STREAMING_MAX_INFLIGHT, CHUNK_STORE_PATH,
+                           PDF_EXTRACTION_CACHE_SIZE)
+
+
+logger = logging.getLogger(__name__)
+
+
+class PDFExtractionError(Exception):
+    """A PDF could not be read (corrupt, truncated or not a PDF) or has no pages."""
+
+
+def _open_pdf(pdf_path: str):
+    """Opens a PDF with PyMuPDF, which is imported on first use rather than with this module."""
+    import fitz  # PyMuPDF
+    return fitz.open(pdf_path)
+
+
+def _extract_page(page, stats: Metrics) -> Tuple[List[str], List[List[str]]]:
+    """Extracts (blocks, tables) from one fitz page, timing text and table extraction into `stats`."""
+    # Extract text blocks (block[4] is the text content)
+    with stats.span("pdf_page_text"):
+        blocks = [block[4].strip() for block in page.get_text("blocks")]
+    # Extract tables
+    tables = []
+    with stats.span("pdf_table_detection"):
+        for table in page.find_tables():
+            tables.append([" | ".join([cell if cell is not None else "" for cell in row_data]) for row_data in table.extract()])
+    return blocks, tables
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[List[Tuple[List[str], List[List[str]]]], dict]:
+    """
+    Extracts (blocks, tables) for pages [start, stop) of a PDF.
+    Runs in worker processes, so it opens its own fitz document and returns its
+    timings as a metrics snapshot for the parent to merge.
+    """
+    stats = Metrics()
+    with _open_pdf(pdf_path) as pdf_document:
+        pages = [_extract_page(pdf_document.load_page(page_num), stats) for page_num in range(start, stop)]
+    return pages, stats.snapshot()
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """
+    Yields (blocks, tables) page by page, holding only the current page in memory.
+    Raises PDFExtractionError if the PDF can't be opened or has no pages.
+    """
+    try:
+        metrics.incr("pdf_bytes", os.path.getsize(pdf_path))
+        pdf_document = _open_pdf(pdf_path)
+    except Exception as e:
+        raise PDFExtractionError(f"Could not open {pdf_path}: {type(e).__name__}: {e}") from e
+    with pdf_document:
+        if not pdf_document.page_count:
+            raise PDFExtractionError(f"{pdf_path} has no pages")
+        for page_num in range(pdf_document.page_count):
+            metrics.incr("pdf_pages")
+            yield _extract_page(pdf_document.load_page(page_num), metrics)
+
+
+def chunk_metadata(pdf_id: str, chunk_index: int, chunk: str = None) -> dict:
+    """
+    Metadata stored with each chunk vector. The chunk text is only included
+    when given, i.e. when there is no local ChunkStore to hold it.
+    """
+    metadata = {"pdf_id": pdf_id, "chunk_index": chunk_index}
+    if chunk is not None:
+        metadata["content"] = chunk
+    return metadata
+
+
+@dataclass
+class PDFExtraction:
+    """
+    Everything extracted from one PDF, computed once and shared by indexing,
+    role extraction and RAG queries.
+    page_blocks[p] holds the stripped text blocks of page p, page_tables[p]
+    holds one list of " | "-joined rows per table found on page p.
+    """
+    pdf_path: str
+    text: str
+    page_blocks: List[List[str]]
+    page_tables: List[List[List[str]]]
+    content_hash: str
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_blocks)
+
+    def units(self) -> Iterator[str]:
+        """The blocks and tables that make up `text` (which is these joined by blank lines)."""
+        return iter_text_units(self.page_blocks, self.page_tables)
+
+
+@dataclass
+class IndexPlan:
+    """The vector store changes needed to bring one document's index up to date."""
+    pdf_id: str
+    chunks_by_id: Dict[str, Tuple[int, str]]
+    new_ids: List[str]
+    stale_ids: Set[str]
+    # True when there is no chunk store, so the text has to travel in the vector metadata
+    include_content: bool = False
+
+    @property
+    def new_chunks(self) -> List[str]:
+        return [self.chunks_by_id[vector_id][1] for vector_id in self.new_ids]
+
+    def vectors(self, embeddings: List[list]) -> list:
+        """Builds (id, embedding, metadata) tuples for the new chunks; chunks without an embedding are skipped."""
+        vectors = []
+        for vector_id, embedding in zip(self.new_ids, embeddings):
+            if embedding:
+                i, chunk = self.chunks_by_id[vector_id]
+                vectors.append((vector_id, embedding, chunk_metadata(self.pdf_id, i, chunk if self.include_content else None)))
+        return vectors
+
+    def report(self, pdf_path: str, summary: UpsertSummary):
+        print(f"Indexed {pdf_path}: {len(self.chunks_by_id)} chunks, {summary.upserted} upserted, {summary.failed} failed, "
+              f"{len(self.chunks_by_id) - len(self.new_ids)} unchanged, {len(self.stale_ids)} stale removed.")
+
+
+class RoleInput:
+    """
+    What role extraction needs from a document, gathered in one pass over its
+    text units: the content hash (equal to PDFExtraction.content_hash), the
+    catalog roles found by the pre-pass and the units left for the LLM. Only
+    those units are kept, so with a scanner memory grows with the text the
+    catalog doesn't explain, not with the document.
+    """
+
+    def __init__(self, scanner: RoleScanner = None):
+        self.scanner = scanner
+        self.has_text = False
+        self._digest = hashlib.sha256()
+        self._unit_count = 0
+        self._scan = RoleScan(scanner) if scanner is not None else None
+        self._units: List[str] = []
+
+    def add(self, unit: str):
+        # Hashes "\n\n".join(units) incrementally, like PDFExtraction.text
+        if self._unit_count:
+            self._digest.update(b"\n\n")
+        self._digest.update(unit.encode("utf-8"))
+        self._unit_count += 1
+        self.has_text = self.has_text or bool(unit.strip())
+        if self._scan is not None:
+            self._scan.add(unit)
+        else:
+            self._units.append(unit)
+
+    @property
+    def unit_count(self) -> int:
+        return self._unit_count
+
+    @property
+    def content_hash(self) -> str:
+        return self._digest.hexdigest()
+
+    @property
+    def prepass_roles(self) -> List[str]:
+        return self._scan.roles if self._scan is not None else []
+
+    @property
+    def llm_units(self) -> List[str]:
+        return self._scan.residual if self._scan is not None else self._units
+
+    def matches(self, scanner: Optional[RoleScanner]) -> bool:
+        """True if this input was scanned with `scanner` (or an equivalent one)."""
+        if self.scanner is None or scanner is None:
+            return self.scanner is scanner
+        return self.scanner is scanner or self.scanner.roles == scanner.roles
+
 
 class RAGPDFExtractor:
-    def __init__(self):
-        self.gemini_client = GeminiClient()
-        self.pinecone_client = PineconeClient()
+    def __init__(self, extraction_workers=PDF_EXTRACTION_WORKERS, pages_per_task=PDF_PAGES_PER_TASK, vector_store=None,
+                 segment_tokens=ROLE_EXTRACTION_SEGMENT_TOKENS, role_extraction_workers=ROLE_EXTRACTION_WORKERS, role_cache=None,
+                 bypass_role_cache=ROLE_CACHE_BYPASS, role_prepass=ROLE_PREPASS,
+                 streaming_min_pages=PDF_STREAMING_MIN_PAGES, streaming_max_inflight=PDF_STREAMING_MAX_INFLIGHT,
+                 gemini_client=None, chunk_store=None, extraction_cache_size=PDF_EXTRACTION_CACHE_SIZE):
+        # Remote clients are created on first use, so constructing an extractor costs no imports or handshakes
+        self._gemini_client = gemini_client
+        self._vector_store = vector_store
+        self._clients_lock = threading.Lock()
+        self.segment_tokens = max(1, segment_tokens)
+        self.role_extraction_workers = role_extraction_workers
+        # Role results are cached on disk per document and per segment (disabled if ROLE_CACHE_PATH is empty)
+        if role_cache is None and ROLE_CACHE_PATH:
+            role_cache = RoleResultCache(ROLE_CACHE_PATH, max_entries=ROLE_CACHE_MAX_ENTRIES, ttl_seconds=ROLE_CACHE_TTL_SECONDS)
+        self.role_cache = role_cache
+        self.bypass_role_cache = bypass_role_cache
+        # Chunk text lives in the local chunk store rather than in vector metadata (unless CHUNK_STORE_PATH is empty)
+        if chunk_store is None and CHUNK_STORE_PATH:
+            chunk_store = ChunkStore(CHUNK_STORE_PATH)
+        self.chunk_store = chunk_store
+        self.role_prepass = role_prepass
+        self.extraction_workers = extraction_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.streaming_min_pages = streaming_min_pages
+        self.streaming_max_inflight = max(1, streaming_max_inflight)
+        # PDF extractions kept in memory, keyed by path and file stat; callers running many documents
+        # at once should allow at least one entry per document in flight
+        self.extraction_cache_size = max(1, extraction_cache_size)
+        self._extractions = OrderedDict()
+        # RoleInputs gathered by streaming indexing, taken by the next extract_roles_from_pdf
+        self._role_inputs = OrderedDict()
+        # Keys of extractions in use by a running validation (see pinned), never evicted
+        self._pins = Counter()
+        # Extractors are shared across worker threads in batch runs
+        self._extractions_lock = threading.Lock()
 
-    def _extract_text_and_tables_from_pdf(self, pdf_path: str) -> str:
+    @property
+    def gemini_client(self) -> GeminiClient:
+        if self._gemini_client is None:
+            with self._clients_lock:
+                if self._gemini_client is None:
+                    self._gemini_client = GeminiClient()
+        return self._gemini_client
+
+    @property
+    def vector_store(self):
+        # Pinecone by default; VECTOR_STORE_BACKEND=local keeps everything in-process
+        if self._vector_store is None:
+            with self._clients_lock:
+                if self._vector_store is None:
+                    self._vector_store = create_vector_store()
+        return self._vector_store
+
+    def connect(self):
+        """
+        Creates the Gemini model (importing the SDK) and connects the vector store now
+        rather than on first use, so long-running services start warm and fail fast
+        on bad configuration.
+        """
+        self.gemini_client.model
+        self.vector_store
+
+    def extract(self, pdf_path: str) -> PDFExtraction:
+        """
+        Returns the extraction for a PDF, running PyMuPDF only the first time
+        the file is seen (or after it changes on disk).
+        """
+        cache_key = self._extraction_key(pdf_path)
+        extraction = self.cached_extraction(pdf_path, cache_key)
+        if extraction is not None:
+            return extraction
+
+        extraction = self._run_extraction(pdf_path)
+        self._cache_extraction(cache_key, extraction)
+        return extraction
+
+    def _cache_extraction(self, cache_key, extraction: PDFExtraction):
+        if cache_key is not None:
+            with self._extractions_lock:
+                self._extractions[cache_key] = extraction
+                self._evict_extractions()
+
+    def _evict_extractions(self):
+        # Least recently used first, skipping pinned ones (the cache may briefly exceed its size)
+        excess = len(self._extractions) - self.extraction_cache_size
+        for cache_key in [key for key in self._extractions if key not in self._pins][:max(0, excess)]:
+            del self._extractions[cache_key]
+
+    @contextmanager
+    def pinned(self, pdf_path: str):
+        """
+        Keeps the PDF's extraction in memory while the block runs, so the stages
+        of one validation never re-extract it, however many other documents are
+        extracted concurrently.
+        """
+        cache_key = self._extraction_key(pdf_path)
+        with self._extractions_lock:
+            self._pins[cache_key] += 1
+        try:
+            yield
+        finally:
+            with self._extractions_lock:
+                self._pins[cache_key] -= 1
+                if not self._pins[cache_key]:
+                    del self._pins[cache_key]
+                self._evict_extractions()
+
+    @staticmethod
+    def _extraction_key(pdf_path: str):
+        try:
+            stat = os.stat(pdf_path)
+            return (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def cached_extraction(self, pdf_path: str, cache_key=None) -> Optional[PDFExtraction]:
+        """Returns the in-memory extraction for a PDF if there is one, without extracting it."""
+        cache_key = cache_key or self._extraction_key(pdf_path)
+        with self._extractions_lock:
+            if cache_key is not None and cache_key in self._extractions:
+                self._extractions.move_to_end(cache_key)
+                return self._extractions[cache_key]
+        return None
+
+    def _run_extraction(self, pdf_path: str) -> PDFExtraction:
         """
         Extracts text content from a PDF file, including tables.
         Handles text and table extraction. For images, OCR might be needed
         as a pre-processing step if they contain relevant text.
+        With more than one extraction worker, page ranges are spread across a
+        process pool; results are reassembled in page order, so the output is
+        identical to the serial path.
+        Raises PDFExtractionError if the PDF can't be read or has no pages, so a
+        broken file is never reported as a document without roles.
         """
-        full_text = []
+        with metrics.span("pdf_extraction"):
+            pages = self._extract_pages(pdf_path)
+        return self._build_extraction(pdf_path, pages)
+
+    @staticmethod
+    def _build_extraction(pdf_path: str, pages: List[Tuple[List[str], List[List[str]]]]) -> PDFExtraction:
+        """Assembles a PDFExtraction from per-page (blocks, tables), in page order."""
+        page_blocks = [blocks for blocks, _ in pages]
+        page_tables = [tables for _, tables in pages]
+        full_document_text = "\n\n".join(iter_text_units(page_blocks, page_tables))
+        logger.debug("Full extracted PDF text (including tables) of %s:\n%s", pdf_path, full_document_text)
+        content_hash = hashlib.sha256(full_document_text.encode("utf-8")).hexdigest()
+        return PDFExtraction(pdf_path, full_document_text, page_blocks, page_tables, content_hash)
+
+    def _page_ranges(self, pdf_path: str) -> List[Tuple[int, int]]:
+        """[start, stop) ranges of `pages_per_task` pages; raises PDFExtractionError if the PDF can't be opened or has no pages."""
         try:
-            pdf_document = fitz.open(pdf_path)
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document.load_page(page_num)
-                # Extract text blocks
-                text_blocks = page.get_text("blocks")
-                for block in text_blocks:
-                    # block[4] is the text content
-                    full_text.append(block[4].strip())
-
-                # Extract tables
-                tables = page.find_tables()
-                for table in tables:
-                    table_rows = []
-                    for row_data in table.extract():
-                        table_rows.append(" | ".join([cell if cell is not None else "" for cell in row_data]))
-                    table_str = "\n".join(table_rows)
-                    # --- MODIFICATION: More descriptive markers for tables ---
-                    full_text.append(f"\n--- DATA TABLE WITH ROLES AND COUNTS ---\n{table_str.strip()}\n--- END OF TABLE DATA ---")
-                    # --- END MODIFICATION ---
-            pdf_document.close()
+            metrics.incr("pdf_bytes", os.path.getsize(pdf_path))
+            with _open_pdf(pdf_path) as pdf_document:
+                page_count = pdf_document.page_count
         except Exception as e:
-            print(f"Error extracting text from PDF: {e}")
-        
-        full_document_text = "\n\n".join(full_text)
-        # --- DEBUGGING LINE: UNCOMMENTED ---
-        print(f"\n--- DEBUG: Full Extracted PDF Text (including tables) ---\n{full_document_text}\n---------------------------------------------------\n")
-        # --- END DEBUG LINE ---
-        return full_document_text
-
-
-    def process_pdf(self, pdf_path: str, pdf_id: str):
-        """Processes the PDF: extracts text, chunks, embeds, and upserts to Pinecone."""
-        text = self._extract_text_and_tables_from_pdf(pdf_path)
-        if not text.strip():
-            print(f"No content extracted from {pdf_path}. Skipping indexing.")
+            raise PDFExtractionError(f"Could not open {pdf_path}: {type(e).__name__}: {e}") from e
+        if not page_count:
+            raise PDFExtractionError(f"{pdf_path} has no pages")
+        return [(start, min(start + self.pages_per_task, page_count)) for start in range(0, page_count, self.pages_per_task)]
+
+    def _extract_pages(self, pdf_path: str) -> List[Tuple[List[str], List[List[str]]]]:
+        pages = []
+        ranges = self._page_ranges(pdf_path)
+        try:
+            if self.extraction_workers > 1 and len(ranges) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.extraction_workers, len(ranges))) as pool:
+                    futures = [pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+                    results = [future.result() for future in futures]
+            else:
+                results = [_extract_page_range(pdf_path, start, stop) for start, stop in ranges]
+            for range_pages, stats in results:
+                pages.extend(range_pages)
+                metrics.merge(stats)
+            metrics.incr("pdf_pages", len(pages))
+        except Exception as e:
+            raise PDFExtractionError(f"Error extracting text from {pdf_path}: {type(e).__name__}: {e}") from e
+        return pages
+
+    def _iter_pages(self, pdf_path: str) -> Iterator[Tuple[List[str], List[List[str]]]]:
+        """
+        Yields (blocks, tables) in page order for streaming. With more than one
+        extraction worker, page ranges are extracted in the process pool, at most
+        two ranges per worker ahead of the consumer, so memory stays bounded.
+        """
+        if self.extraction_workers <= 1:
+            yield from iter_pdf_pages(pdf_path)
             return
+        ranges = iter(self._page_ranges(pdf_path))
+        with ProcessPoolExecutor(max_workers=self.extraction_workers) as pool:
+            pending = deque(pool.submit(_extract_page_range, pdf_path, start, stop)
+                            for start, stop in islice(ranges, self.extraction_workers * 2))
+            while pending:
+                try:
+                    range_pages, stats = pending.popleft().result()
+                except Exception as e:
+                    raise PDFExtractionError(f"Error extracting text from {pdf_path}: {type(e).__name__}: {e}") from e
+                for start, stop in islice(ranges, 1):
+                    pending.append(pool.submit(_extract_page_range, pdf_path, start, stop))
+                metrics.merge(stats)
+                metrics.incr("pdf_pages", len(range_pages))
+                yield from range_pages
 
-        chunks = chunk_text(text, PDF_CHUNK_SIZE, PDF_CHUNK_OVERLAP)
-        vectors_to_upsert = []
-        for i, chunk in enumerate(chunks):
-            embedding = self.gemini_client.embed_text(chunk)
-            if embedding:
-                # Use a unique ID for each vector
-                vector_id = f"{pdf_id}-{uuid.uuid4().hex}"
-                vectors_to_upsert.append((vector_id, embedding, {"pdf_id": pdf_id, "chunk_index": i, "content": chunk}))
-        
+    def _extract_text_and_tables_from_pdf(self, pdf_path: str) -> str:
+        """Returns the full extracted text (including table markers) of a PDF."""
+        return self.extract(pdf_path).text
+
+
+    @staticmethod
+    def chunk_vector_id(pdf_id: str, chunk: str) -> str:
+        """Deterministic vector ID for a chunk: identical chunk text always maps to the same ID."""
+        return f"{pdf_id}#{hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:32]}"
+
+    def plan_index(self, pdf_path: str, pdf_id: str) -> Optional[IndexPlan]:
+        """
+        Chunks the PDF and diffs its deterministic chunk IDs against what is already
+        indexed for `pdf_id`. Returns None if nothing was extracted.
+        """
+        extraction = self.extract(pdf_path)
+        if not extraction.text.strip():
+            print(f"No content extracted from {pdf_path}. Skipping indexing.")
+            return None
+
+        # Chunks follow block and table boundaries, sized by token budget
+        chunks = iter_chunks(extraction.page_blocks, extraction.page_tables)
+        # Map each vector ID to its first (chunk_index, chunk); repeated chunks share one vector
+        chunks_by_id = {}
+        with metrics.span("chunking"):
+            for i, chunk in enumerate(chunks):
+                chunks_by_id.setdefault(self.chunk_vector_id(pdf_id, chunk), (i, chunk))
+        metrics.incr("chunks", len(chunks_by_id))
+
+        # Each document is isolated in its own namespace, named after its pdf_id
+        existing_ids = self.vector_store.list_ids(prefix=f"{pdf_id}#", namespace=pdf_id)
+        if existing_ids is None:
+            # Can't diff against the index, so rebuild this document's vectors from scratch
+            print(f"Could not list existing vectors for PDF ID: {pdf_id}. Re-indexing all chunks.")
+            self.clear_pdf_data(pdf_id)
+            existing_ids = []
+        existing_ids = set(existing_ids)
+        new_ids = [vector_id for vector_id in chunks_by_id if vector_id not in existing_ids]
+        stale_ids = existing_ids - chunks_by_id.keys()
+        if self.chunk_store:
+            # Stored before any upsert, so a vector is never retrievable without its text. All current
+            # chunks are written (not just new ones), so a fresh local store catches up with the index.
+            self.chunk_store.put_many(pdf_id, ((vector_id, chunk) for vector_id, (_, chunk) in chunks_by_id.items()))
+            self.chunk_store.retain(pdf_id, chunks_by_id.keys())
+        return IndexPlan(pdf_id, chunks_by_id, new_ids, stale_ids, include_content=self.chunk_store is None)
+
+    def process_pdf(self, pdf_path: str, pdf_id: str, streaming: bool = None, catalog=None):
+        """
+        Processes the PDF: extracts text, chunks, embeds, and upserts to the vector store.
+        Indexing is incremental: chunks whose ID is already in the index are skipped
+        and vectors for chunks no longer in the document are deleted, so the work
+        scales with the size of the edit rather than the size of the document.
+        Documents of at least `streaming_min_pages` pages that haven't been extracted
+        yet are indexed with process_pdf_streaming (or pass `streaming` explicitly),
+        which is given `catalog`. Returns the UpsertSummary for the new chunks, or None if nothing was extracted.
+        """
+        if streaming is None:
+            streaming = self._should_stream(pdf_path)
+        if streaming:
+            return self.process_pdf_streaming(pdf_path, pdf_id, catalog=catalog)
+
+        plan = self.plan_index(pdf_path, pdf_id)
+        if plan is None:
+            return None
+
+        # Embed only the new chunks in batched requests; results come back in chunk order
+        with metrics.span("embedding"):
+            vectors_to_upsert = plan.vectors(self.gemini_client.embed_texts(plan.new_chunks))
+
+        summary = UpsertSummary()
         if vectors_to_upsert:
-            self.pinecone_client.upsert_vectors(vectors=vectors_to_upsert)
-            print(f"Processed and indexed {len(chunks)} chunks from {pdf_path}")
+            summary = self._upsert(vectors_to_upsert, pdf_id)
+        elif plan.new_ids:
+            print(f"No embeddings generated for {pdf_path}. Skipping upsert.")
+        if plan.stale_ids:
+            self.vector_store.delete_ids(plan.stale_ids, namespace=pdf_id)
+        # Stores that buffer writes (the local store) save the document once, not per batch
+        self.vector_store.persist()
+        plan.report(pdf_path, summary)
+        return summary
+
+    def _upsert(self, vectors: list, pdf_id: str) -> UpsertSummary:
+        with metrics.span("upsert"):
+            summary = self.vector_store.upsert_vectors(vectors=vectors, namespace=pdf_id)
+        metrics.incr("vectors_upserted", summary.upserted)
+        metrics.incr("vectors_failed", summary.failed)
+        return summary
+
+    def _should_stream(self, pdf_path: str) -> bool:
+        if self.streaming_min_pages <= 0 or self.cached_extraction(pdf_path) is not None:
+            return False
+        try:
+            with _open_pdf(pdf_path) as pdf_document:
+                return pdf_document.page_count >= self.streaming_min_pages
+        except Exception:
+            return False
+
+    def process_pdf_streaming(self, pdf_path: str, pdf_id: str, catalog=None):
+        """
+        Memory-bounded indexing: pages -> chunks -> embedding batches -> upsert batches.
+        Pages are read in order (from the extraction pool, or the extraction cache),
+        each embedding batch is upserted on a background thread while the next one
+        is embedded, and at most `streaming_max_inflight` upsert batches are
+        outstanding before the reader waits. Apart from the set of chunk IDs used
+        for the incremental diff, memory does not grow with the document.
+        Given the `catalog` the next extract_roles_from_pdf call will use, the same
+        pass also runs the role pre-pass (see RoleInput), so role extraction never
+        reads the PDF again; without one, nothing is kept for it.
+        Returns the UpsertSummary for the new chunks, or None if nothing was extracted.
+        """
+        cache_key = self._extraction_key(pdf_path)
+        extraction = self.cached_extraction(pdf_path, cache_key)
+        role_input = None
+        if extraction:
+            pages = zip(extraction.page_blocks, extraction.page_tables)
         else:
-            print(f"No embeddings generated for {pdf_path}. Skipping indexing.")
+            pages = self._iter_pages(pdf_path)
+            if catalog is not None:
+                role_input = RoleInput(self._role_scanner(catalog))
+                pages = self._feed_role_input(pages, role_input)
+
+        existing_ids = self.vector_store.list_ids(prefix=f"{pdf_id}#", namespace=pdf_id)
+        if existing_ids is None:
+            print(f"Could not list existing vectors for PDF ID: {pdf_id}. Re-indexing all chunks.")
+            self.clear_pdf_data(pdf_id)
+            existing_ids = []
+        existing_ids = set(existing_ids)
+
+        seen_ids = set()
+        summary = UpsertSummary()
+        chunk_count = 0
+        batch = []
+        unstored = []
+        in_flight = set()
+
+        def collect(done):
+            for future in done:
+                summary.merge(future.result())
 
-    def extract_roles_from_pdf(self, pdf_path: str) -> list:
-        """Extracts roles from the PDF using Gemini LLM."""
-        # For role extraction, we directly send the full extracted text (including table markers) to the LLM
-        extracted_text = self._extract_text_and_tables_from_pdf(pdf_path)
-        if not extracted_text.strip():
+        def store_chunks():
+            if self.chunk_store and unstored:
+                self.chunk_store.put_many(pdf_id, unstored)
+            unstored.clear()
+
+        with ThreadPoolExecutor(max_workers=self.streaming_max_inflight) as pool:
+            def flush():
+                nonlocal in_flight
+                # Chunk text goes to the chunk store before its vector is upserted
+                store_chunks()
+                with metrics.span("embedding"):
+                    embeddings = self.gemini_client.embed_texts([chunk for _, _, chunk in batch])
+                content = self.chunk_store is None
+                vectors = [(vector_id, embedding, chunk_metadata(pdf_id, i, chunk if content else None))
+                           for (vector_id, i, chunk), embedding in zip(batch, embeddings) if embedding]
+                batch.clear()
+                # Backpressure: don't embed further ahead than the vector store can absorb
+                while len(in_flight) >= self.streaming_max_inflight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                if vectors:
+                    in_flight.add(pool.submit(self._upsert, vectors, pdf_id))
+
+            try:
+                for i, chunk in enumerate(iter_page_chunks(pages)):
+                    chunk_count += 1
+                    metrics.incr("chunks")
+                    vector_id = self.chunk_vector_id(pdf_id, chunk)
+                    if vector_id in seen_ids:
+                        continue
+                    seen_ids.add(vector_id)
+                    unstored.append((vector_id, chunk))
+                    if len(unstored) >= self.gemini_client.embedding_batch_size:
+                        store_chunks()
+                    if vector_id not in existing_ids:
+                        batch.append((vector_id, i, chunk))
+                        if len(batch) >= self.gemini_client.embedding_batch_size:
+                            flush()
+                if batch:
+                    flush()
+                store_chunks()
+            finally:
+                collect(wait(in_flight).done)
+
+        if role_input is not None and cache_key is not None:
+            with self._extractions_lock:
+                self._role_inputs[cache_key] = role_input
+                while len(self._role_inputs) > self.extraction_cache_size:
+                    self._role_inputs.popitem(last=False)
+        if not chunk_count:
+            print(f"No content extracted from {pdf_path}. Skipping indexing.")
+            return None
+        stale_ids = existing_ids - seen_ids
+        if stale_ids:
+            self.vector_store.delete_ids(list(stale_ids), namespace=pdf_id)
+        self.vector_store.persist()
+        if self.chunk_store:
+            self.chunk_store.retain(pdf_id, seen_ids)
+        print(f"Indexed {pdf_path} (streaming): {chunk_count} chunks, {summary.upserted} upserted, {summary.failed} failed, "
+              f"{len(seen_ids & existing_ids)} unchanged, {len(stale_ids)} stale removed.")
+        return summary
+
+    def extract_roles_from_pdf(self, pdf_path: str, use_cache: bool = None, catalog=None, llm_limit=None) -> list:
+        """
+        Extracts roles from the PDF with Gemini: catalog roles found verbatim are taken
+        as-is, and the remaining spans go to the LLM in token-budgeted segments, in parallel.
+        Results are cached per document and per segment (`use_cache=False` refreshes them);
+        `llm_limit`, if given, is held around each Gemini call. Raises GeminiError if a call fails.
+        """
+        scanner = self._role_scanner(catalog)
+        # Streaming indexing may already have gathered the input in its pass over the pages; otherwise
+        # the extraction is shared with process_pdf, so the PDF is still only parsed once per run
+        role_input = self._take_role_input(pdf_path, scanner)
+        extraction = self.extract(pdf_path) if role_input is None else None
+        content_hash = extraction.content_hash if extraction else role_input.content_hash
+        if not (extraction.text.strip() if extraction else role_input.has_text):
             print(f"No content extracted from {pdf_path} for role extraction.")
             return []
 
-        prompt = f"{ROLE_EXTRACTION_PROMPT}\n\nDocument Content:\n{extracted_text}"
+        if use_cache is None:
+            use_cache = not self.bypass_role_cache
+        document_key = None
+        if self.role_cache is not None:
+            # The result lists the roles in the document, so the key leaves out the catalog: re-validating
+            # against an updated catalog reuses it (the pre-pass only changes which spans the LLM reads)
+            scope = f"document:{content_hash}:{self.segment_tokens}"
+            document_key = RoleResultCache.make_key(self.gemini_client.model_name, ROLE_EXTRACTION_PROMPT, scope)
+            cached = self.role_cache.get(document_key) if use_cache else None
+            metrics.incr("role_cache_hits" if cached is not None else "role_cache_misses")
+            if cached is not None:
+                print(f"Using cached role extraction for {pdf_path}.")
+                return cached
+
+        if role_input is None:
+            role_input = RoleInput(scanner)
+            with metrics.span("role_prepass"):
+                for unit in extraction.units():
+                    role_input.add(unit)
+        prepass_roles, units = role_input.prepass_roles, role_input.llm_units
+        if scanner is not None:
+            print(f"Pre-pass found {len(prepass_roles)} catalog roles; {len(units)} of {role_input.unit_count} text units "
+                  f"have spans that need the LLM.")
+
+        segments = list(split_into_segments(units, self.segment_tokens))
+        if len(segments) > 1:
+            print(f"Document exceeds {self.segment_tokens} tokens; extracting roles from {len(segments)} segments...")
+
+        def extract_segment(segment):
+            return self._extract_roles_from_segment(segment, use_cache, llm_limit)
+
+        if len(segments) <= 1 or self.role_extraction_workers <= 1:
+            segment_roles = [extract_segment(segment) for segment in segments]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.role_extraction_workers, len(segments))) as pool:
+                segment_roles = list(pool.map(extract_segment, segments))
+
+        # Merge in segment order, keeping the first spelling of each normalized role
+        roles_by_normalized = {}
+        for roles in [prepass_roles] + segment_roles:
+            for role in roles:
+                roles_by_normalized.setdefault(normalize_role(role), role)
+        roles = list(roles_by_normalized.values())
+        if document_key is not None:
+            self.role_cache.put(document_key, roles)
+        return roles
+
+    def _role_scanner(self, catalog) -> Optional[RoleScanner]:
+        if catalog is None or not self.role_prepass:
+            return None
+        return catalog.scanner if isinstance(catalog, RoleCatalog) else RoleScanner(catalog)
+
+    @staticmethod
+    def _feed_role_input(pages, role_input: RoleInput):
+        """Passes pages through, adding each page's text units to `role_input` on the way."""
+        for blocks, tables in pages:
+            for unit in iter_text_units([blocks], [tables]):
+                role_input.add(unit)
+            yield blocks, tables
+
+    def _take_role_input(self, pdf_path: str, scanner: Optional[RoleScanner]) -> Optional[RoleInput]:
+        """The RoleInput streamed for this version of the file with the same scanner, if any (used once)."""
+        cache_key = self._extraction_key(pdf_path)
+        with self._extractions_lock:
+            role_input = self._role_inputs.pop(cache_key, None)
+        return role_input if role_input is not None and role_input.matches(scanner) else None
+
+    def _extract_roles_from_segment(self, segment: str, use_cache: bool = True, llm_limit=None) -> list:
+        """Runs role extraction on one segment of document text, using the per-segment cache."""
+        cache_key = None
+        if self.role_cache is not None:
+            cache_key = RoleResultCache.make_key(self.gemini_client.model_name, ROLE_EXTRACTION_PROMPT, segment)
+            cached = self.role_cache.get(cache_key) if use_cache else None
+            metrics.incr("role_cache_hits" if cached is not None else "role_cache_misses")
+            if cached is not None:
+                return cached
+
+        # For role extraction, we directly send the extracted text (including table markers) to the LLM
+        prompt = f"{ROLE_EXTRACTION_PROMPT}\n\nDocument Content:\n{segment}"
         print("Sending prompt to Gemini for role extraction...")
-        raw_roles_str = self.gemini_client.generate_text(prompt)
+        with llm_limit or nullcontext():
+            raw_roles_str = self.gemini_client.generate_text(prompt)
 
         roles = []
-        if raw_roles_str and raw_roles_str.lower() != 'none':
-            roles = [role.strip() for role in raw_roles_str.split(',') if role.strip()]
-            return list(set(roles))
-        elif raw_roles_str.lower() == 'none':
+        if raw_roles_str and raw_roles_str.strip().lower() != 'none':
+            roles = list(dict.fromkeys(role.strip() for role in raw_roles_str.split(',') if role.strip()))
+        elif raw_roles_str.strip().lower() == 'none':
             print("Gemini reported no roles found in the document.")
         else:
             print("Gemini returned empty or unparseable response for roles.")
-        return []
+
+        if cache_key is not None:
+            self.role_cache.put(cache_key, roles)
+        return roles
+
+    def document_id(self, pdf_path: str) -> str:
+        """
+        Content-addressed PDF ID (and vector store namespace) for a document.
+        Identical uploads share one namespace; different documents never collide.
+        Hashes the file bytes, so it costs no extraction and indexing can still stream.
+        """
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as pdf_file:
+            for block in iter(lambda: pdf_file.read(1 << 20), b""):
+                digest.update(block)
+        return f"doc-{digest.hexdigest()[:16]}"
 
     def clear_pdf_data(self, pdf_id: str):
-        """Deletes all vectors associated with a specific PDF ID from Pinecone."""
-        try:
-            self.pinecone_client.index.delete(filter={"pdf_id": {"$eq": pdf_id}})
-            print(f"Deleted data for PDF ID: {pdf_id} from Pinecone.")
-        except NotFoundException:
-            print(f"No existing data found for PDF ID: {pdf_id} in Pinecone. Skipping delete.")
-        except Exception as e:
-            print(f"An unexpected error occurred while deleting data for PDF ID {pdf_id}: {e}")
+        """Deletes all vectors associated with a specific PDF ID (its namespace) from the vector store."""
+        self.vector_store.delete_namespace(pdf_id)
+        self.vector_store.persist()
+        if self.chunk_store:
+            self.chunk_store.delete_document(pdf_id)
 
-    def query_pdf_for_roles_from_pinecone(self, pdf_path: str, query: str) -> str:
+    def chunk_texts(self, matches: list) -> Dict[str, str]:
         """
-        Queries the processed PDF content (via Pinecone) for specific information.
+        Returns {vector_id: chunk text} for query matches: taken from the metadata
+        of vectors indexed with their text, otherwise fetched from the chunk store
+        in a single lookup.
+        """
+        texts = {match.id: match.metadata["content"] for match in matches if match.metadata and "content" in match.metadata}
+        missing = [match.id for match in matches if match.id not in texts]
+        if missing and self.chunk_store:
+            with metrics.span("chunk_fetch"):
+                texts.update(self.chunk_store.get_many(missing))
+        return texts
+
+    def query_pdf_for_roles_from_pinecone(self, pdf_path: str, query: str, pdf_id: str = None) -> str:
+        """
+        Queries the processed PDF content (via the vector store) for specific information.
         This demonstrates RAG in action for general queries, not just role extraction.
+        Only the namespace of `pdf_id` (by default the PDF's content-addressed ID) is searched.
         """
-        query_embedding = self.gemini_client.embed_text(query)
-        if not query_embedding:
+        if pdf_id is None:
+            pdf_id = self.document_id(pdf_path)
+        try:
+            query_embedding = self.gemini_client.embed_text(query)
+        except GeminiError as e:
+            print(f"Error embedding query: {e}")
             return "Could not generate query embedding."
 
-        # --- IMPORTANT: Print raw Pinecone results for debugging ---
-        # Increased top_k to ensure more context is retrieved if available
-        results = self.pinecone_client.query_vectors(query_embedding, top_k=10) 
-        print(f"\n--- DEBUG: Raw Pinecone Query Results (top {len(results.matches)} matches) ---")
-        for match in results.matches:
-            print(f"  ID: {match.id}, Score: {match.score}, Content (first 100 chars): {match.metadata.get('content', '')[:100]}...")
-        print("---------------------------------------------------\n")
+        # Chunks are aligned to blocks and tables, so a few of them carry the relevant context
+        with metrics.span("vector_query"):
+            matches = self.vector_store.query_vectors(query_embedding, top_k=RAG_TOP_K, namespace=pdf_id)
+        texts = self.chunk_texts(matches)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw vector query results for %r (top %d matches):\n%s", query, len(matches), "\n".join(
+                f"  ID: {match.id}, Score: {match.score}, Content (first 100 chars): {texts.get(match.id, '')[:100]}..."
+                for match in matches))
 
-        if not results.matches: # Changed to check results.matches directly
+        if not matches:
             return "No relevant information found in PDF."
 
         retrieved_contexts = []
-        for match in results.matches: # Iterate over results.matches
-            if 'metadata' in match and 'content' in match.metadata:
-                retrieved_contexts.append(match.metadata['content'])
+        for match in matches:
+            if match.id in texts:
+                retrieved_contexts.append(texts[match.id])
             else:
-                print(f"Warning: Content not found in metadata for vector ID: {match.id}")
+                print(f"Warning: Content not found for vector ID: {match.id}")
 
         if not retrieved_contexts:
-            # This handles cases where matches exist but lack 'content' metadata
+            # This handles cases where matches exist but their text is neither in the metadata nor the chunk store
             return "No content retrieved from relevant chunks."
 
         full_context = "\n\n".join(retrieved_contexts)
-        
-        # --- DEBUGGING LINE: UNCOMMENTED ---
-        print("\n--- DEBUG: Context sent to LLM for general query ---")
-        print(full_context)
-        print("---------------------------------------------------\n")
-        # --- END DEBUG LINES ---
+        logger.debug("Context sent to LLM for general query:\n%s", full_context)
 
         # IMPROVEMENT: Tailor the prompt for table data extraction
         if "table" in query.lower() or "count" in query.lower() or "number of" in query.lower() or "how many" in query.lower():
@@ -153,5 +795,8 @@ class RAGPDFExtractor:
             prompt = (f"Based on the following document excerpts, answer the question: '{query}'.\n\n"
                       f"Document Excerpts:\n{full_context}\n\nAnswer:")
 
-        answer = self.gemini_client.generate_text(prompt)
-        return answer
\ No newline at end of file
+        try:
+            return self.gemini_client.generate_text(prompt, priority=PRIORITY_HIGH)
+        except GeminiError as e:
+            print(f"Error answering query: {e}")
+            return f"Could not generate an answer: {e}"
\ No newline at end of file
@@ -1,14 +1,32 @@
 # src/pinecone_client.py
 from pinecone import Pinecone, Index, ServerlessSpec # Added ServerlessSpec
-from pinecone.exceptions import PineconeApiException # Import for error handling
-from config.config import PINECONE_API_KEY, PINECONE_INDEX_NAME
+from pinecone.exceptions import PineconeApiException, NotFoundException # Import for error handling
+from config.config import (PINECONE_API_KEY, PINECONE_INDEX_NAME, PINECONE_UPSERT_BATCH_SIZE,
+                           PINECONE_UPSERT_WORKERS, PINECONE_UPSERT_MAX_RETRIES, PINECONE_UPSERT_BACKOFF)
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import HTTPError as TransportError # Pinecone's HTTP transport
+from src.vector_store import VectorStore, UpsertSummary
 import time # Import time for waiting for index to be ready
 
-class PineconeClient:
-    def __init__(self, index_name=PINECONE_INDEX_NAME, dimension=768): # Gemini embedding dimension is 768
+def _is_retryable_status(status) -> bool:
+    """Rate limiting, server errors and responses without a status (network issues) are worth retrying."""
+    return status is None or status == 429 or status >= 500
+
+# Network failures below the API layer; anything else that isn't a PineconeApiException is a bug and is raised
+_TRANSPORT_ERRORS = (ConnectionError, TimeoutError, TransportError)
+
+
+class PineconeClient(VectorStore):
+    def __init__(self, index_name=PINECONE_INDEX_NAME, dimension=768, # Gemini embedding dimension is 768
+                 upsert_batch_size=PINECONE_UPSERT_BATCH_SIZE, upsert_workers=PINECONE_UPSERT_WORKERS,
+                 upsert_max_retries=PINECONE_UPSERT_MAX_RETRIES, upsert_backoff=PINECONE_UPSERT_BACKOFF):
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
         self.index_name = index_name
         self.dimension = dimension
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.upsert_workers = max(1, upsert_workers)
+        self.upsert_max_retries = max(0, upsert_max_retries)
+        self.upsert_backoff = upsert_backoff
         self.index: Index = self._get_or_create_index()
 
     def _get_or_create_index(self):
@@ -54,26 +72,94 @@ class PineconeClient:
 
         return self.pc.Index(self.index_name)
 
-    def upsert_vectors(self, vectors: list):
-        """Upserts vectors to Pinecone."""
+    def upsert_vectors(self, vectors: list, namespace: str = None) -> UpsertSummary:
+        """
+        Upserts vectors to Pinecone, into `namespace` if given.
+        Vectors are sent in batches of `upsert_batch_size` over a bounded pool of
+        `upsert_workers` concurrent requests. Each batch is retried with exponential
+        backoff on retryable errors; the returned summary reports what was upserted,
+        what failed and how many retries were needed.
+        """
+        summary = UpsertSummary(total=len(vectors))
         if not vectors:
             print("No vectors to upsert.")
-            return
-        try:
-            self.index.upsert(vectors=vectors)
-            print(f"Upserted {len(vectors)} vectors to Pinecone index '{self.index_name}'.")
-        except PineconeApiException as e:
-            print(f"Error upserting vectors to Pinecone: {e}")
+            return summary
+
+        batches = [vectors[start:start + self.upsert_batch_size] for start in range(0, len(vectors), self.upsert_batch_size)]
+        with ThreadPoolExecutor(max_workers=min(self.upsert_workers, len(batches))) as pool:
+            results = pool.map(lambda batch: self._upsert_batch(batch, namespace), batches)
+            for batch, (retries, error) in zip(batches, results):
+                summary.retried += retries
+                if error is None:
+                    summary.upserted += len(batch)
+                else:
+                    summary.failed += len(batch)
+                    summary.failed_ids.extend(vector[0] for vector in batch)
+                    summary.errors.append(error)
+
+        print(f"Upserted {summary.upserted}/{summary.total} vectors to Pinecone index '{self.index_name}' "
+              f"in {len(batches)} batches ({summary.retried} retries, {summary.failed} failed).")
+        if summary.failed:
             # Often, upsert errors are due to index not being ready or malformed vectors
             print("Please ensure the index is ready and vector dimensions/format are correct.")
+        return summary
+
+    def _upsert_batch(self, batch: list, namespace: str = None):
+        """
+        Upserts one batch, retrying transport errors and 429/5xx responses. Returns
+        (retries_used, error_message or None); other errors are raised immediately.
+        """
+        for attempt in range(self.upsert_max_retries + 1):
+            try:
+                self.index.upsert(vectors=batch, namespace=namespace)
+                return attempt, None
+            except (PineconeApiException, *_TRANSPORT_ERRORS) as e:
+                # Older clients expose the HTTP status as .status, newer ones as .status_code
+                status = getattr(e, "status", None) or getattr(e, "status_code", None)
+                retryable = not isinstance(e, PineconeApiException) or _is_retryable_status(status)
+                if not retryable or attempt == self.upsert_max_retries:
+                    print(f"Error upserting batch of {len(batch)} vectors to Pinecone: {e}")
+                    return attempt, str(e)
+                delay = self.upsert_backoff * (2 ** attempt)
+                print(f"Upsert of {len(batch)} vectors failed ({e}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def list_ids(self, prefix: str, namespace: str = None):
+        """
+        Lists the IDs of all vectors in `namespace` whose ID starts with `prefix`.
+        Returns None if the index cannot be listed (e.g. pod-based indexes), so
+        callers can fall back to a full rebuild.
+        """
+        try:
+            ids = []
+            for id_batch in self.index.list(prefix=prefix, namespace=namespace):
+                ids.extend(id_batch)
+            return ids
+        except PineconeApiException as e:
+            print(f"Error listing vector IDs with prefix '{prefix}': {e}")
+            return None
         except Exception as e:
-            print(f"An unexpected error occurred during upsert: {e}")
+            print(f"An unexpected error occurred while listing vector IDs: {e}")
+            return None
 
+    def delete_ids(self, ids: list, namespace: str = None, batch_size: int = 1000):
+        """Deletes vectors by ID from `namespace`, in batches the delete endpoint accepts."""
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            try:
+                self.index.delete(ids=batch, namespace=namespace)
+            except PineconeApiException as e:
+                print(f"Error deleting {len(batch)} vectors from Pinecone: {e}")
+            except Exception as e:
+                print(f"An unexpected error occurred while deleting vectors: {e}")
+        if ids:
+            print(f"Deleted {len(ids)} vectors from Pinecone index '{self.index_name}'.")
 
-    def query_vectors(self, query_embedding: list, top_k: int = 3) -> list:
-        """Queries Pinecone for similar vectors."""
+    def query_vectors(self, query_embedding: list, top_k: int = 3, namespace: str = None) -> list:
+        """Queries Pinecone for similar vectors, within `namespace` if given."""
         try:
-            results = self.index.query(vector=query_embedding, top_k=top_k, include_metadata=True)
+            results = self.index.query(vector=query_embedding, top_k=top_k, include_metadata=True, namespace=namespace)
             return results.matches
         except PineconeApiException as e:
             print(f"Error querying Pinecone: {e}")
@@ -83,12 +169,39 @@ class PineconeClient:
             print(f"An unexpected error occurred during query: {e}")
             return []
 
+    def delete_by_filter(self, metadata_filter: dict, namespace: str = None):
+        """Deletes vectors matching a metadata filter (pod-based indexes only; serverless indexes reject filters)."""
+        try:
+            self.index.delete(filter=metadata_filter, namespace=namespace)
+            print(f"Deleted vectors matching {metadata_filter} from index: {self.index_name}")
+        except NotFoundException:
+            print(f"No vectors matching {metadata_filter} in index '{self.index_name}'. Skipping delete.")
+        except PineconeApiException as e:
+            print(f"Error deleting vectors by filter from Pinecone: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred during delete by filter: {e}")
+
+    def delete_namespace(self, namespace: str):
+        """
+        Deletes every vector in one namespace. Each document lives in its own
+        namespace, so this only touches that document's data and is safe to call
+        while other documents are being indexed or queried.
+        """
+        try:
+            self.index.delete(delete_all=True, namespace=namespace)
+            print(f"Deleted namespace '{namespace}' from index: {self.index_name}")
+        except NotFoundException:
+            print(f"Namespace '{namespace}' does not exist in index '{self.index_name}'. Skipping delete.")
+        except PineconeApiException as e:
+            print(f"Error deleting namespace '{namespace}' from Pinecone: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred while deleting namespace '{namespace}': {e}")
+
     def delete_all_vectors(self):
         """Deletes all vectors from the index."""
         try:
-            # Note: This deletes ALL vectors in the index, regardless of namespace.
-            # If you only wanted to delete for a specific pdf_id, that would be done
-            # via a filter, as implemented in pdf_extractor_rag.py's clear_pdf_data.
+            # Note: This deletes ALL vectors in the default namespace. Per-document
+            # data lives in its own namespace; use delete_namespace for that.
             self.index.delete(delete_all=True)
             print(f"All vectors deleted from index: {self.index_name}")
         except PineconeApiException as e:
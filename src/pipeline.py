@@ -0,0 +1,69 @@
+# src/pipeline.py
+import time
+from contextlib import contextmanager
+from src.pdf_extractor_rag import RAGPDFExtractor
+from src.role_catalog import RoleCatalog
+from src.role_comparer import RoleComparer
+
+@contextmanager
+def document_result(pdf_path: str, pdf_id: str = None):
+    """
+    Yields the result dict for one document. An exception raised in the block
+    is recorded as status "error" instead of propagating, and the elapsed time
+    is filled in on exit.
+    """
+    start = time.perf_counter()
+    result = {
+        "pdf_path": pdf_path,
+        "pdf_id": pdf_id,
+        "status": "ok",
+        "is_incorrect": None,
+        "matched_roles": [],
+        "incorrect_pdf_roles": [],
+        "pdf_roles": [],
+        "vectors_failed": 0,
+        "error": None,
+    }
+    try:
+        yield result
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+
+
+def record_comparison(result: dict, comparer: RoleComparer, catalog: RoleCatalog, pdf_roles: list):
+    """Compares the extracted roles against the catalog and stores the outcome in `result`."""
+    is_incorrect, matched_roles, incorrect_pdf_roles = comparer.compare_roles(catalog, pdf_roles)
+    result.update(
+        is_incorrect=is_incorrect,
+        matched_roles=matched_roles,
+        incorrect_pdf_roles=incorrect_pdf_roles,
+        pdf_roles=sorted(pdf_roles),
+    )
+
+
+def validate_document(pdf_extractor: RAGPDFExtractor, catalog: RoleCatalog, comparer: RoleComparer,
+                      pdf_path: str, pdf_id: str = None, index: bool = True, progress=None) -> dict:
+    """
+    Runs the extract -> (index) -> LLM role extraction -> compare pipeline for one PDF
+    against a prebuilt catalog, reusing the given clients.
+    Never raises: failures are reported with status "error" so one bad document
+    doesn't stop a batch. `progress(stage, fraction)`, if given, is called as each stage starts.
+    """
+    progress = progress or (lambda stage, fraction: None)
+    with document_result(pdf_path, pdf_id) as result:
+        # Every stage reuses one extraction of the PDF, kept in memory until the last one is done
+        with pdf_extractor.pinned(pdf_path):
+            progress("extracting PDF", 0.05)
+            if pdf_id is None:
+                pdf_id = result["pdf_id"] = pdf_extractor.document_id(pdf_path)
+            if index:
+                progress("indexing", 0.3)
+                summary = pdf_extractor.process_pdf(pdf_path, pdf_id, catalog=catalog)
+                if summary is not None:
+                    result["vectors_failed"] = summary.failed
+            progress("extracting roles", 0.6)
+            pdf_roles = pdf_extractor.extract_roles_from_pdf(pdf_path, catalog=catalog)
+        progress("comparing roles", 0.9)
+        record_comparison(result, comparer, catalog, pdf_roles)
+    return result
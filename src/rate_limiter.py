@@ -0,0 +1,126 @@
+# src/rate_limiter.py
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable, Dict
+from src.metrics import metrics
+
+PRIORITY_HIGH = 0    # interactive requests (RAG queries)
+PRIORITY_NORMAL = 5  # role extraction
+PRIORITY_LOW = 10    # bulk indexing (embeddings)
+
+# HTTP statuses and google.api_core exception names worth retrying
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+                    "InternalServerError", "GatewayTimeout", "Aborted"}
+_RATE_LIMIT_NAMES = {"ResourceExhausted", "TooManyRequests"}
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "code", None) == 429 or type(error).__name__ in _RATE_LIMIT_NAMES
+
+def is_retryable_error(error: Exception) -> bool:
+    """Quota, server and network errors are retryable; bad requests, auth errors and the like are not."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, "code", None) in _RETRYABLE_STATUS or type(error).__name__ in _RETRYABLE_NAMES
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over each minute, holding at most one minute's worth. 0 = unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are available now)."""
+        if self.capacity <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.available >= amount else (amount - self.available) / self.rate
+
+    def consume(self, amount: float):
+        if self.capacity > 0:
+            self.available -= min(amount, self.capacity)
+
+
+class RequestScheduler:
+    """
+    Shared gate for calls to one rate-limited API. Each call waits for both a
+    requests-per-minute and a tokens-per-minute bucket, callers are admitted in
+    priority order (lower value first, FIFO within a priority), and retryable
+    errors are retried with exponential backoff and full jitter. Once retries
+    are exhausted, or for non-retryable errors, the last exception is re-raised.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def acquire(self, tokens: int = 0, priority: int = PRIORITY_NORMAL):
+        """Blocks until this caller is first in line and both buckets can cover the request."""
+        ticket = (priority, next(self._sequence))
+        start = time.perf_counter()
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if delay == 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            metrics.record("rate_limit_wait", time.perf_counter() - start)
+                            return
+                        self._condition.wait(timeout=delay)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn: Callable, *args, tokens: int = 0, priority: int = PRIORITY_NORMAL, **kwargs):
+        """Runs fn(*args, **kwargs) under the rate limits, retrying retryable errors."""
+        attempt = 0
+        while True:
+            self.acquire(tokens, priority)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                metrics.incr("api_retries")
+                print(f"Retryable API error ({type(e).__name__}: {e}). Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(name: str, **limits) -> RequestScheduler:
+    """Process-wide scheduler for one API (e.g. "generate", "embed"), created on first use with `limits`."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = RequestScheduler(**limits)
+        return _schedulers[name]
@@ -0,0 +1,81 @@
+# src/role_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+class RoleResultCache:
+    """
+    On-disk cache of parsed LLM role-extraction results, keyed by a hash of
+    (model name, prompt, text). Entries older than `ttl_seconds` (0 = never)
+    are treated as misses and purged, and once the cache holds more than
+    `max_entries` results, the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 100000, ttl_seconds: float = 0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS role_results ("
+            " key TEXT PRIMARY KEY,"
+            " roles TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_role_results_last_used ON role_results (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model_name, prompt, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Returns the cached role list for `key`, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT roles, created FROM role_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM role_results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE role_results SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, roles: List[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO role_results (key, roles, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(roles), now, now),
+            )
+            if self.ttl_seconds > 0:
+                self._conn.execute("DELETE FROM role_results WHERE created < ?", (now - self.ttl_seconds,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM role_results").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM role_results WHERE key IN "
+                    "(SELECT key FROM role_results ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
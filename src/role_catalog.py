@@ -0,0 +1,115 @@
+# src/role_catalog.py
+import json
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils import normalize_role, best_fuzzy_matches
+from src.role_scanner import RoleScanner
+from src.xml_parser import extract_roles_from_xml
+from config.config import ROLE_CATALOG_CANDIDATES
+
+class RoleCatalog:
+    """
+    The XML role list, prepared once for repeated matching.
+    Precomputes each role's normalized form and a character n-gram inverted
+    index, so a fuzzy lookup only scores the short list of roles that share the
+    most n-grams with the query instead of the whole catalog. Catalogs can be
+    saved to and loaded from JSON so services skip the XML parse at startup.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, roles: Iterable[str], ngram_size: int = 3, candidate_limit: int = ROLE_CATALOG_CANDIDATES):
+        self.roles: List[str] = list(roles)
+        self.ngram_size = ngram_size
+        self.candidate_limit = candidate_limit
+        self.normalized: List[str] = [normalize_role(role) for role in self.roles]
+        self._build_lookups()
+        self.index: Dict[str, List[int]] = defaultdict(list)
+        for i, role in enumerate(self.roles):
+            for gram in set(self._ngrams(role)):
+                self.index[gram].append(i)
+
+    def _build_lookups(self):
+        # Original spellings for each normalized form, in catalog order
+        self.by_normalized: Dict[str, List[str]] = defaultdict(list)
+        for role, norm in zip(self.roles, self.normalized):
+            if role not in self.by_normalized[norm]:
+                self.by_normalized[norm].append(role)
+
+    @classmethod
+    def from_xml(cls, xml_filepath: str, role_xpath: str, **kwargs) -> "RoleCatalog":
+        return cls(extract_roles_from_xml(xml_filepath, role_xpath), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    def __iter__(self):
+        return iter(self.roles)
+
+    def _ngrams(self, text: str) -> List[str]:
+        # Fuzzy scores compare original strings, so the index is built on them too (lowercased, padded)
+        padded = f" {text.lower()} "
+        n = self.ngram_size
+        return [padded[i:i + n] for i in range(max(1, len(padded) - n + 1))]
+
+    @property
+    def scanner(self) -> RoleScanner:
+        """Multi-pattern scanner over the catalog, built on first use and then reused."""
+        if getattr(self, "_scanner", None) is None:
+            self._scanner = RoleScanner(self.roles)
+        return self._scanner
+
+    def candidates(self, query: str) -> List[int]:
+        """Indices of the roles sharing the most n-grams with `query`, in catalog order."""
+        if len(self.roles) <= self.candidate_limit:
+            return list(range(len(self.roles)))
+        shared = Counter()
+        for gram in set(self._ngrams(query)):
+            shared.update(self.index.get(gram, ()))
+        return sorted(i for i, _ in shared.most_common(self.candidate_limit))
+
+    def best_matches(self, queries: List[str], threshold: int, workers: int = -1) -> List[Tuple[Optional[int], int]]:
+        """
+        Best-scoring catalog role (index, score) for each query, like utils.best_fuzzy_matches.
+        Small catalogs are scored in one full matrix; large ones only against each query's candidates.
+        """
+        if len(self.roles) <= self.candidate_limit:
+            return best_fuzzy_matches(queries, self.roles, threshold, workers=workers)
+        results = []
+        for query in queries:
+            candidate_indices = self.candidates(query)
+            best, score = best_fuzzy_matches([query], [self.roles[i] for i in candidate_indices], threshold, workers=workers)[0]
+            results.append((candidate_indices[best] if best is not None else None, score))
+        return results
+
+    def save(self, path: str):
+        """Writes the catalog, including normalized forms and the n-gram index, to a JSON file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": self.FORMAT_VERSION,
+            "ngram_size": self.ngram_size,
+            "candidate_limit": self.candidate_limit,
+            "roles": self.roles,
+            "normalized": self.normalized,
+            "index": self.index,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> "RoleCatalog":
+        """Loads a catalog written by save() without re-normalizing or re-indexing."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported role catalog format version in {path}: {data.get('version')}")
+        catalog = cls.__new__(cls)
+        catalog.roles = data["roles"]
+        catalog.ngram_size = data["ngram_size"]
+        catalog.candidate_limit = data["candidate_limit"]
+        catalog.normalized = data["normalized"]
+        catalog._build_lookups()
+        catalog.index = defaultdict(list, data["index"])
+        return catalog
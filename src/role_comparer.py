@@ -1,46 +1,57 @@
 # src/role_comparer.py
-from typing import List, Tuple
-from src.utils import normalize_role, fuzzy_match
-from config.config import FUZZY_MATCH_THRESHOLD
+from typing import List, Tuple, Union
+from src.utils import normalize_role
+from src.role_catalog import RoleCatalog
+from src.metrics import metrics
+from config.config import FUZZY_MATCH_THRESHOLD, FUZZY_MATCH_WORKERS
 
 class RoleComparer:
-    def __init__(self, fuzzy_threshold=FUZZY_MATCH_THRESHOLD):
+    def __init__(self, fuzzy_threshold=FUZZY_MATCH_THRESHOLD, workers=FUZZY_MATCH_WORKERS):
         self.fuzzy_threshold = fuzzy_threshold
+        # Threads used to compute the fuzzy score matrix (-1 = all cores)
+        self.workers = workers
 
-    def compare_roles(self, xml_roles: List[str], pdf_roles: List[str]) -> Tuple[bool, List[str], List[str]]:
+    def compare_roles(self, xml_roles: Union[RoleCatalog, List[str]], pdf_roles: List[str]) -> Tuple[bool, List[str], List[str]]:
         """
         Compares roles from XML and PDF and determines if PDF roles are correct.
+        `xml_roles` may be a prebuilt RoleCatalog (reused across documents) or a plain list.
         Returns (is_incorrect, matched_roles_normalized, incorrect_pdf_roles_original).
         """
-        normalized_xml_roles = {normalize_role(role) for role in xml_roles}
+        with metrics.span("compare"):
+            return self._compare_roles(xml_roles, pdf_roles)
+
+    def _compare_roles(self, xml_roles: Union[RoleCatalog, List[str]], pdf_roles: List[str]) -> Tuple[bool, List[str], List[str]]:
+        catalog = xml_roles if isinstance(xml_roles, RoleCatalog) else RoleCatalog(xml_roles)
+        normalized_xml_roles = catalog.by_normalized.keys()
         # Create a mapping from normalized PDF role to its original string
         normalized_pdf_to_original = {normalize_role(role): role for role in pdf_roles}
         normalized_pdf_roles = set(normalized_pdf_to_original.keys())
 
         # Find direct matches
-        matched_normalized_roles = normalized_xml_roles.intersection(normalized_pdf_roles)
+        matched_normalized_roles = {role for role in normalized_pdf_roles if role in normalized_xml_roles}
 
         # Identify roles in PDF that are not exact matches in XML
         potentially_incorrect_pdf_normalized = normalized_pdf_roles - normalized_xml_roles
 
-        # Try fuzzy matching for potentially incorrect PDF roles against all XML roles
+        # Fuzzy match all potentially incorrect PDF roles against all XML roles in one batched call,
+        # keeping the best-scoring XML role for each (compare against original strings, as before)
+        unmatched_pdf_normalized = sorted(potentially_incorrect_pdf_normalized)
+        fuzzy_results = catalog.best_matches(
+            [normalized_pdf_to_original[pdf_norm] for pdf_norm in unmatched_pdf_normalized],
+            self.fuzzy_threshold, workers=self.workers,
+        )
         still_incorrect_pdf_normalized = set()
-        for pdf_norm in potentially_incorrect_pdf_normalized:
-            original_pdf_role = normalized_pdf_to_original[pdf_norm]
-            found_fuzzy_match = False
-            for xml_orig in xml_roles: # Compare against original XML roles for fuzzy matching
-                if fuzzy_match(original_pdf_role, xml_orig, self.fuzzy_threshold):
-                    found_fuzzy_match = True
-                    # If fuzzy match found, consider it correct and add to matched
-                    matched_normalized_roles.add(normalize_role(xml_orig)) # Add normalized XML role
-                    break
-            if not found_fuzzy_match:
+        for pdf_norm, (best_xml_index, _) in zip(unmatched_pdf_normalized, fuzzy_results):
+            if best_xml_index is None:
                 still_incorrect_pdf_normalized.add(pdf_norm)
+            else:
+                # If fuzzy match found, consider it correct and add to matched
+                matched_normalized_roles.add(catalog.normalized[best_xml_index]) # Add normalized XML role
 
         is_incorrect = bool(still_incorrect_pdf_normalized)
 
         # Convert matched roles to their original XML strings for reporting clarity
-        final_matched_xml_roles = [xml_orig for xml_orig in xml_roles if normalize_role(xml_orig) in matched_normalized_roles]
+        final_matched_xml_roles = [xml_orig for role_norm in matched_normalized_roles for xml_orig in catalog.by_normalized[role_norm]]
         
         # Convert incorrect PDF roles back to their original PDF strings
         final_incorrect_pdf_roles = [normalized_pdf_to_original[role_norm] for role_norm in still_incorrect_pdf_normalized]
@@ -0,0 +1,180 @@
+# src/role_scanner.py
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+from src.chunker import format_table, split_sentences, table_rows
+from src.utils import normalize_role
+
+_WORD = re.compile(r"\w+")
+# Capitalized words that start a sentence or cell without naming anything
+_FUNCTION_WORDS = frozenset(
+    "a an the this that these those our your their its his her my we you they he she it i "
+    "each every all any some no not and or but if when while as at by for from in of on to with "
+    "is are was were be has have had will can may must should please there here".split()
+)
+
+def scan_words(text: str) -> Tuple[str, ...]:
+    """
+    Normalizes text for scanning into its lowercase words, so punctuation,
+    table cell separators and line breaks never prevent a match.
+    """
+    return tuple(_WORD.findall(text.lower()))
+
+
+class RoleScanner:
+    """
+    Finds verbatim catalog roles in document text with an Aho–Corasick automaton
+    over words, in a single pass over each text unit however large the catalog
+    is. Patterns and text are both reduced to lowercase words, so matches are
+    whole-word and ignore case, punctuation and table cell separators.
+
+    `scan` also picks out the spans (prose sentences, table rows) that still
+    contain role-like words once catalog matches are masked out; only those go
+    to the LLM. Role-like means capitalized or an acronym, the way titles such
+    as "Nurse" or "CTO" are written, so a title the catalog doesn't know is
+    sent whether or not its span also holds catalog roles.
+    """
+
+    def __init__(self, roles: Iterable[str]):
+        self.roles: List[str] = list(roles)
+        # Catalog spelling of each pattern (the first one, in catalog order)
+        self.by_pattern: Dict[Tuple[str, ...], str] = {}
+        for role in self.roles:
+            pattern = scan_words(role)
+            if pattern:
+                self.by_pattern.setdefault(pattern, role)
+        self._build_automaton()
+
+    def _build_automaton(self):
+        # Trie of patterns: goto[state][word] -> state, output[state] -> lengths of the patterns ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+        for pattern in self.by_pattern:
+            state = 0
+            for word in pattern:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._output.append([])
+                    self._goto[state][word] = next_state
+                state = next_state
+            self._output[state].append(len(pattern))
+
+        # Breadth-first failure links; each state's outputs include those of its failure state
+        self._fail: List[int] = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, words: Tuple[str, ...]) -> List[Tuple[int, int]]:
+        """All (start, end) word spans of catalog roles, including overlapping ones."""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for i, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for length in output[state]:
+                matches.append((i + 1 - length, i + 1))
+        return matches
+
+    def maximal_matches(self, words: Tuple[str, ...]) -> List[Tuple[int, int]]:
+        """Spans not contained in a longer one ("Manager" inside "Project Manager" is dropped)."""
+        kept = []
+        furthest_end = -1
+        # Sorted by start, longest first: a span is contained in an earlier one iff it ends no later
+        for start, end in sorted(self.find(words), key=lambda span: (span[0], -span[1])):
+            if end <= furthest_end:
+                continue
+            kept.append((start, end))
+            furthest_end = end
+        return kept
+
+    def _scan_span(self, span: str, found: Dict[str, str]) -> Tuple[bool, bool]:
+        """
+        Records the catalog roles in one sentence or table cell in `found`.
+        Returns (has a catalog match, has role-like words the matches don't cover).
+        """
+        tokens = _WORD.findall(span)
+        words = tuple(token.lower() for token in tokens)
+        explained = [False] * len(words)
+        matches = self.maximal_matches(words)
+        for start, end in matches:
+            role = self.by_pattern[words[start:end]]
+            found.setdefault(normalize_role(role), role)
+            explained[start:end] = [True] * (end - start)
+        for i, (token, done) in enumerate(zip(tokens, explained)):
+            if done or not token[0].isupper():
+                continue
+            if i == 0 and words[i] in _FUNCTION_WORDS:
+                continue
+            return bool(matches), True
+        return bool(matches), False
+
+    def _scan_table(self, rows: List[str], found: Dict[str, str], seen: Set[str]) -> List[str]:
+        """The table's rows that need the LLM (first time seen), judged cell by cell."""
+        needed = []
+        for i, row in enumerate(rows):
+            results = [self._scan_span(cell, found) for cell in row.split(" | ")]
+            # A first row with no catalog role and no number is a header ("Role | Count")
+            if i == 0 and not any(matched for matched, _ in results) and not any(ch.isdigit() for ch in row):
+                continue
+            if any(unexplained for _, unexplained in results) and row not in seen:
+                seen.add(row)
+                needed.append(row)
+        return needed
+
+    def scan(self, units: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Scans text units (blocks, tables) for catalog roles.
+        Returns (catalog roles found, in first-seen order with their catalog
+        spelling; the residual units for the LLM). See RoleScan.
+        """
+        state = RoleScan(self)
+        for unit in units:
+            state.add(unit)
+        return state.roles, state.residual
+
+
+class RoleScan:
+    """
+    RoleScanner.scan one unit at a time, e.g. while a PDF is being streamed.
+    A residual unit keeps only the unit's sentences or table rows with role-like
+    words the catalog doesn't explain (tables keep their header row); spans
+    already kept earlier in the document are not repeated.
+    """
+
+    def __init__(self, scanner: RoleScanner):
+        self.scanner = scanner
+        self.found: Dict[str, str] = {}
+        self.residual: List[str] = []
+        self._seen: Set[str] = set()
+
+    @property
+    def roles(self) -> List[str]:
+        return list(self.found.values())
+
+    def add(self, unit: str):
+        rows = table_rows(unit)
+        if rows:
+            needed = self.scanner._scan_table(rows, self.found, self._seen)
+            if needed:
+                self.residual.append(format_table(([rows[0]] if rows[0] not in needed else []) + needed))
+            return
+        sentences = []
+        for sentence in split_sentences(unit):
+            _, unexplained = self.scanner._scan_span(sentence, self.found)
+            if unexplained and sentence not in self._seen:
+                self._seen.add(sentence)
+                sentences.append(sentence)
+        if sentences:
+            self.residual.append(" ".join(sentences))
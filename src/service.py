@@ -0,0 +1,293 @@
+# src/service.py
+"""
+Headless HTTP validation service.
+
+    POST /catalogs            XML body -> 201 {"catalog_id": ..., "roles": n}, 400 if no roles were found
+    POST /jobs?catalog=<id>   PDF body -> 202 {"job": {...}, "deduplicated": bool}
+    GET  /jobs/<id>           job status, stage and progress
+    GET  /jobs/<id>/result    200 with the report once done, 202 while queued or running,
+                              500 with the error if validation failed (resubmitting retries it)
+    GET  /healthz             liveness and queue depth
+    GET  /metrics             stage timings and counters in Prometheus text format
+
+    python -m src.service --xml data/xml_data/defined_roles.xml --port 8080
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from src.jobs import FAILED, Job, JobManager, JobQueueFullError
+from src.metrics import metrics
+from src.pdf_extractor_rag import RAGPDFExtractor
+from src.pipeline import validate_document
+from src.role_catalog import RoleCatalog
+from src.role_comparer import RoleComparer
+from src.batch import load_catalog
+from config.config import (FUZZY_MATCH_THRESHOLD, GEMINI_REQUESTS_PER_MINUTE, JOB_HISTORY_SIZE, LOG_LEVEL,
+                           SERVICE_CATALOG_CACHE_SIZE, SERVICE_HOST, SERVICE_MAX_PENDING, SERVICE_MAX_UPLOAD_MB,
+                           SERVICE_PORT, SERVICE_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG = "default"
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(/result)?$")
+
+
+class DocumentValidationError(Exception):
+    """validate_document reported status "error"; raised so the job fails and is never deduplicated onto."""
+
+
+def default_workers() -> int:
+    """One worker per core, but no more than the Gemini request quota can keep busy (about one request per second each)."""
+    workers = os.cpu_count() or 1
+    if GEMINI_REQUESTS_PER_MINUTE:
+        workers = min(workers, max(1, GEMINI_REQUESTS_PER_MINUTE // 60))
+    return workers
+
+
+class ValidationService:
+    """
+    Validates uploaded PDFs against registered role catalogs on a bounded
+    JobManager pool, sharing one warm RAGPDFExtractor (Gemini client, vector
+    store, caches) and RoleComparer across all jobs. Identical submissions (same
+    PDF bytes and catalog) are deduplicated onto one job, unless that job failed.
+    """
+
+    def __init__(self, pdf_extractor: RAGPDFExtractor = None, default_catalog: RoleCatalog = None,
+                 workers: int = SERVICE_WORKERS, max_pending: int = SERVICE_MAX_PENDING,
+                 catalog_cache_size: int = SERVICE_CATALOG_CACHE_SIZE, role_xpath: str = "//role/text()"):
+        self.workers = workers or default_workers()
+        self.pdf_extractor = pdf_extractor or RAGPDFExtractor(extraction_cache_size=self.workers * 2)
+        self.comparer = RoleComparer(fuzzy_threshold=FUZZY_MATCH_THRESHOLD)
+        self.jobs = JobManager(workers=self.workers, history_size=JOB_HISTORY_SIZE, max_pending=max_pending)
+        self.role_xpath = role_xpath
+        self.catalog_cache_size = catalog_cache_size
+        self._catalogs: "OrderedDict[str, RoleCatalog]" = OrderedDict()
+        self._default_catalog = default_catalog
+        self._lock = threading.Lock()
+
+    def add_catalog(self, xml_bytes: bytes) -> Tuple[str, RoleCatalog]:
+        """
+        Parses an XML catalog (unless the same bytes were registered before) and returns its ID.
+        Raises ValueError if no roles could be extracted (empty or unparseable XML, or no
+        element matching the role XPath); such catalogs are not registered.
+        """
+        catalog_id = hashlib.sha256(xml_bytes).hexdigest()[:16]
+        catalog = self.get_catalog(catalog_id)
+        if catalog is not None:
+            return catalog_id, catalog
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".xml") as tmp_xml:
+            tmp_xml.write(xml_bytes)
+            xml_filepath = tmp_xml.name
+        try:
+            catalog = RoleCatalog.from_xml(xml_filepath, self.role_xpath)
+        finally:
+            os.remove(xml_filepath)
+        if not len(catalog):
+            raise ValueError(f"No roles found in the XML (role XPath {self.role_xpath!r})")
+        with self._lock:
+            self._catalogs[catalog_id] = catalog
+            while len(self._catalogs) > self.catalog_cache_size:
+                self._catalogs.popitem(last=False)
+        return catalog_id, catalog
+
+    def get_catalog(self, catalog_id: str) -> Optional[RoleCatalog]:
+        if catalog_id == DEFAULT_CATALOG:
+            return self._default_catalog
+        with self._lock:
+            catalog = self._catalogs.get(catalog_id)
+            if catalog is not None:
+                self._catalogs.move_to_end(catalog_id)
+            return catalog
+
+    def submit(self, pdf_bytes: bytes, catalog_id: str = DEFAULT_CATALOG) -> Tuple[Job, bool]:
+        """
+        Queues a validation and returns (job, deduplicated). Raises KeyError for
+        an unknown catalog and JobQueueFullError when the queue is full.
+        """
+        catalog = self.get_catalog(catalog_id)
+        if catalog is None:
+            raise KeyError(catalog_id)
+        dedup_key = f"{hashlib.sha256(pdf_bytes).hexdigest()}:{catalog_id}"
+        previous = self.jobs.find(dedup_key)
+        try:
+            job = self.jobs.submit(self._validate, pdf_bytes, catalog, dedup_key=dedup_key)
+        except JobQueueFullError:
+            metrics.incr("service_jobs_rejected")
+            raise
+        deduplicated = job is previous
+        metrics.incr("service_jobs_deduplicated" if deduplicated else "service_jobs_submitted")
+        return job, deduplicated
+
+    def _validate(self, pdf_bytes: bytes, catalog: RoleCatalog, progress=None) -> dict:
+        # The PDF is only written to disk once a worker picks the job up, and removed when it is done
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
+            tmp_pdf.write(pdf_bytes)
+            pdf_filepath = tmp_pdf.name
+        try:
+            result = validate_document(self.pdf_extractor, catalog, self.comparer, pdf_filepath, progress=progress)
+        finally:
+            os.remove(pdf_filepath)
+        if result["status"] != "ok":
+            raise DocumentValidationError(result["error"])
+        # The temporary path means nothing to the caller
+        result.pop("pdf_path", None)
+        return result
+
+    def shutdown(self):
+        self.jobs.shutdown(wait=True)
+
+
+class ValidationRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a ValidationService (set as the server's `service` attribute)."""
+    server_version = "RoleValidator/1.0"
+
+    @property
+    def service(self) -> ValidationService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: dict = None):
+        data = (json.dumps(body) if content_type == "application/json" else body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, headers: dict = None):
+        self._send(status, {"error": message}, headers=headers)
+
+    def _read_body(self) -> Optional[bytes]:
+        """Reads the request body, or sends 400/411/413 and returns None."""
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._error(411, "Content-Length required")
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._error(400, "Content-Length must be a non-negative integer")
+            return None
+        if length > SERVICE_MAX_UPLOAD_MB * 1024 * 1024:
+            self._error(413, f"Upload exceeds {SERVICE_MAX_UPLOAD_MB:g} MB")
+            return None
+        return self.rfile.read(length)
+
+    @staticmethod
+    def _status(job: Job) -> dict:
+        status = job.to_dict()
+        del status["result"]
+        return status
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/healthz":
+            self._send(200, {"status": "ok", "workers": self.service.workers, "pending": self.service.jobs.pending})
+            return
+        if path == "/metrics":
+            self._send(200, metrics.to_prometheus(), content_type="text/plain; version=0.0.4")
+            return
+        match = _JOB_PATH.match(path)
+        job = self.service.jobs.get(match.group(1)) if match else None
+        if job is None:
+            self._error(404, "Not found")
+        elif not match.group(2):
+            self._send(200, self._status(job))
+        elif job.active:
+            self._send(202, self._status(job), headers={"Retry-After": "1"})
+        elif job.status == FAILED:
+            self._send(500, self._status(job))
+        else:
+            self._send(200, job.result)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ("/catalogs", "/jobs"):
+            self._error(404, "Not found")
+            return
+        body = self._read_body()
+        if body is None:
+            return
+        if url.path == "/catalogs":
+            try:
+                catalog_id, catalog = self.service.add_catalog(body)
+            except ValueError as e:
+                self._error(400, str(e))
+            else:
+                self._send(201, {"catalog_id": catalog_id, "roles": len(catalog)})
+            return
+
+        if not body.startswith(b"%PDF"):
+            self._error(400, "Request body must be a PDF document")
+            return
+        catalog_id = parse_qs(url.query).get("catalog", [DEFAULT_CATALOG])[0]
+        try:
+            job, deduplicated = self.service.submit(body, catalog_id)
+        except KeyError:
+            self._error(404, f"Unknown catalog '{catalog_id}'; register it with POST /catalogs")
+        except JobQueueFullError as e:
+            self._error(503, f"Job queue is full ({e}); retry later", headers={"Retry-After": "5"})
+        else:
+            self._send(202, {"job": self._status(job), "deduplicated": deduplicated},
+                       headers={"Location": f"/jobs/{job.id}"})
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve PDF role validation over HTTP.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--xml", help="Default XML role catalog (or a RoleCatalog saved as .json), used when a job names no catalog.")
+    parser.add_argument("--xpath", default="//role/text()", help="XPath selecting role names in XML catalogs.")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS,
+                        help="Documents validated concurrently (0 = one per core, capped by the Gemini request quota).")
+    parser.add_argument("--max-pending", type=int, default=SERVICE_MAX_PENDING,
+                        help="Queued plus running jobs before new submissions are rejected (0 = unbounded).")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=LOG_LEVEL)
+
+    default_catalog = None
+    if args.xml:
+        default_catalog = load_catalog(args.xml, args.xpath)
+        if not len(default_catalog):
+            print("Warning: No roles extracted from XML. Please check XML file and XPath.", file=sys.stderr)
+
+    service = ValidationService(default_catalog=default_catalog, workers=args.workers,
+                                max_pending=args.max_pending, role_xpath=args.xpath)
+    # Clients are created (and the vector index connected) once, before the first request
+    try:
+        service.pdf_extractor.connect()
+    except Exception as e:
+        print(f"Error: could not initialize the Gemini client or vector store: {type(e).__name__}: {e}", file=sys.stderr)
+        service.shutdown()
+        return 1
+    server = ThreadingHTTPServer((args.host, args.port), ValidationRequestHandler)
+    server.service = service
+    print(f"Serving on http://{args.host}:{server.server_port} with {service.workers} workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 # src/utils.py
 import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
 
 def normalize_role(role_name: str) -> str:
     """Normalizes a role name for consistent comparison."""
@@ -15,16 +17,72 @@ def fuzzy_match(str1: str, str2: str, threshold: int) -> bool:
     """Performs fuzzy matching between two strings."""
     return fuzz.ratio(str1, str2) >= threshold
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> list:
-    """Splits text into chunks with a specified size and overlap."""
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        # Ensure ASCII for embedding model compatibility if needed, otherwise remove .encode/.decode
-        segment = text[start:end].encode('ascii', 'ignore').decode('ascii')
-        chunks.append(segment)
-        if start + chunk_size >= len(text): # Avoid infinite loop if chunk_size - overlap is 0 or less
-            break
-        start += chunk_size - overlap
-    return chunks
\ No newline at end of file
+def best_fuzzy_matches(queries: Sequence[str], choices: Sequence[str], threshold: int, workers: int = -1) -> List[Tuple[Optional[int], int]]:
+    """
+    For each query, finds the best-scoring choice by fuzz.ratio in one batched call.
+    The whole score matrix is computed by rapidfuzz's cdist (multi-threaded across
+    `workers` cores, -1 = all), with pairs below the threshold cut off early.
+    Returns (index of best choice or None, rounded score) per query, in query order;
+    ties go to the earliest choice. Scores are rounded like fuzzywuzzy's ratio, so
+    a pair passes exactly when fuzzy_match would pass it.
+    """
+    if not queries:
+        return []
+    if not choices:
+        return [(None, 0) for _ in queries]
+    # round(score) >= threshold  <=>  score >= threshold - 0.5
+    scores = rapid_process.cdist(queries, choices, scorer=rapid_fuzz.ratio,
+                                 score_cutoff=max(0.0, threshold - 0.5), workers=workers)
+    best_indices = scores.argmax(axis=1)
+    results = []
+    for query, best, row in zip(queries, best_indices, scores):
+        score = int(round(float(row[best])))
+        # fuzzywuzzy scores empty strings as 0; rapidfuzz treats them as identical
+        if query and score >= threshold and (score > 0 or threshold <= 0):
+            results.append((int(best), score))
+        else:
+            results.append((None, score))
+    return results
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) used for rate limiting and token budgets."""
+    return len(text) // 4 + 1
+
+def split_into_segments(units: Iterable[str], max_tokens: int, separator: str = "\n\n") -> Iterator[str]:
+    """
+    Packs text units (blocks, tables) into segments of at most `max_tokens`
+    estimated tokens, joined with `separator`, without splitting a unit.
+    A single unit larger than the budget is split on line breaks, and a single
+    line larger than the budget on the character budget.
+    """
+    max_chars = max(1, max_tokens * 4)
+    current, current_tokens = [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if unit_tokens > max_tokens:
+            if current:
+                yield separator.join(current)
+                current, current_tokens = [], 0
+            piece = ""
+            for line in unit.split("\n"):
+                while len(line) > max_chars:
+                    if piece:
+                        yield piece
+                        piece = ""
+                    yield line[:max_chars]
+                    line = line[max_chars:]
+                if piece and len(piece) + 1 + len(line) > max_chars:
+                    yield piece
+                    piece = line
+                else:
+                    piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                yield piece
+            continue
+        if current and current_tokens + unit_tokens > max_tokens:
+            yield separator.join(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        yield separator.join(current)
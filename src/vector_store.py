@@ -0,0 +1,292 @@
+# src/vector_store.py
+import asyncio
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+from config.config import VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORE_PATH
+
+
+@dataclass
+class UpsertSummary:
+    """Outcome of an upsert_vectors call."""
+    total: int = 0
+    upserted: int = 0
+    failed: int = 0
+    retried: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+    def merge(self, other: "UpsertSummary"):
+        """Adds the counts and failures of another upsert (e.g. one streamed batch) to this summary."""
+        self.total += other.total
+        self.upserted += other.upserted
+        self.failed += other.failed
+        self.retried += other.retried
+        self.failed_ids.extend(other.failed_ids)
+        self.errors.extend(other.errors)
+
+
+@dataclass
+class VectorMatch:
+    """A query result, shaped like Pinecone's ScoredVector (id, score, metadata)."""
+    id: str
+    score: float
+    metadata: dict
+
+
+class VectorStore(ABC):
+    """
+    Interface RAGPDFExtractor uses to index and search chunk embeddings.
+    Vectors are (id, embedding, metadata) tuples; every method accepts an optional
+    namespace, and each document is stored in its own namespace.
+    """
+
+    @abstractmethod
+    def upsert_vectors(self, vectors: list, namespace: str = None) -> UpsertSummary:
+        """Inserts or replaces vectors."""
+
+    @abstractmethod
+    def query_vectors(self, query_embedding: list, top_k: int = 3, namespace: str = None) -> list:
+        """Returns the top_k most similar vectors as matches with id, score and metadata."""
+
+    @abstractmethod
+    def list_ids(self, prefix: str, namespace: str = None) -> Optional[List[str]]:
+        """Lists vector IDs starting with `prefix`, or returns None if the store can't list IDs."""
+
+    @abstractmethod
+    def delete_ids(self, ids: list, namespace: str = None):
+        """Deletes vectors by ID."""
+
+    @abstractmethod
+    def delete_by_filter(self, metadata_filter: dict, namespace: str = None):
+        """Deletes vectors whose metadata matches a Pinecone-style filter."""
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str):
+        """Deletes every vector in a namespace."""
+
+    def persist(self):
+        """Writes buffered changes to durable storage; a no-op for stores that write through (e.g. Pinecone)."""
+
+    # --- Async variants: run the blocking calls in worker threads so they overlap on one event loop ---
+
+    async def aupsert_vectors(self, vectors: list, namespace: str = None) -> UpsertSummary:
+        return await asyncio.to_thread(self.upsert_vectors, vectors, namespace)
+
+    async def aquery_vectors(self, query_embedding: list, top_k: int = 3, namespace: str = None) -> list:
+        return await asyncio.to_thread(self.query_vectors, query_embedding, top_k, namespace)
+
+    async def adelete_ids(self, ids: list, namespace: str = None):
+        return await asyncio.to_thread(self.delete_ids, ids, namespace)
+
+
+def matches_filter(metadata: dict, metadata_filter: dict) -> bool:
+    """
+    Evaluates a Pinecone-style metadata filter, e.g. {"pdf_id": {"$eq": "doc-1"}}.
+    Supports plain equality and the $eq, $ne, $in and $nin operators.
+    """
+    for key, condition in metadata_filter.items():
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator not in ("$eq", "$ne", "$in", "$nin"):
+                raise ValueError(f"Unsupported metadata filter operator: {operator}")
+    return True
+
+
+class _Namespace:
+    """
+    Vectors of one namespace: normalized float32 rows plus parallel ids and metadata.
+    Rows live in a buffer with spare capacity that doubles when full, so appending
+    a batch only copies the new rows (amortized), not the whole matrix.
+    """
+
+    def __init__(self, ids=None, matrix=None, metadata=None):
+        self.ids: List[str] = ids or []
+        self.rows: Dict[str, int] = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        # May be a read-only memory map until the first write
+        self._buffer: Optional[np.ndarray] = matrix
+        self.metadata: List[dict] = metadata or []
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        return self._buffer[:len(self.ids)] if self._buffer is not None else None
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._buffer.shape[1] if self._buffer is not None else None
+
+    def writable(self, rows: int, dimension: int) -> np.ndarray:
+        """Returns the buffer, made writable and grown to hold at least `rows` rows."""
+        buffer = self._buffer
+        if buffer is None or not buffer.flags.writeable or len(buffer) < rows:
+            capacity = max(rows, 2 * len(self.ids), 64)
+            grown = np.empty((capacity, dimension), dtype=np.float32)
+            if buffer is not None:
+                grown[:len(self.ids)] = buffer[:len(self.ids)]
+            self._buffer = grown
+        return self._buffer
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store: a NumPy matrix of L2-normalized embeddings per
+    namespace, searched with a single matrix-vector product (cosine similarity)
+    and an argpartition top-k. With `persist_dir`, each namespace is saved as a
+    .npy matrix plus a JSON sidecar for ids and metadata, and loaded back
+    memory-mapped on first use. Changes are kept in memory until persist(), so
+    a document indexed in many batches is written to disk once, not per batch.
+    """
+
+    def __init__(self, persist_dir: str = None):
+        self.persist_dir = persist_dir or None
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        # Namespaces changed since the last persist()
+        self._dirty = set()
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+
+    def _paths(self, namespace: str):
+        safe_name = re.sub(r"[^\w.-]", "_", namespace or "__default__")
+        base = os.path.join(self.persist_dir, safe_name)
+        return f"{base}.npy", f"{base}.json"
+
+    def _get(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = _Namespace()
+            if self.persist_dir:
+                matrix_path, meta_path = self._paths(namespace)
+                if os.path.exists(matrix_path) and os.path.exists(meta_path):
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        sidecar = json.load(f)
+                    ns = _Namespace(sidecar["ids"], np.load(matrix_path, mmap_mode="r"), sidecar["metadata"])
+            self._namespaces[namespace] = ns
+        return ns
+
+    def _save(self, namespace: str, ns: _Namespace):
+        if not self.persist_dir:
+            return
+        matrix_path, meta_path = self._paths(namespace)
+        if not ns.ids:
+            for path in (matrix_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        # Write to temporary files first so a crash never leaves a half-written namespace
+        np.save(matrix_path + ".tmp.npy", np.ascontiguousarray(ns.matrix, dtype=np.float32))
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": ns.ids, "metadata": ns.metadata}, f)
+        os.replace(matrix_path + ".tmp.npy", matrix_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def upsert_vectors(self, vectors: list, namespace: str = None) -> UpsertSummary:
+        """Inserts or replaces vectors; embeddings are normalized once here so queries are a plain dot product."""
+        summary = UpsertSummary(total=len(vectors))
+        if not vectors:
+            return summary
+        embeddings = np.asarray([vector[1] for vector in vectors], dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            ns = self._get(namespace)
+            if ns.dimension is not None and ns.dimension != embeddings.shape[1]:
+                raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match "
+                                 f"namespace dimension {ns.dimension}.")
+            new_count = sum(1 for vector_id in dict.fromkeys(vector[0] for vector in vectors) if vector_id not in ns.rows)
+            buffer = ns.writable(len(ns.ids) + new_count, embeddings.shape[1])
+            for (vector_id, _, metadata), embedding in zip(vectors, embeddings):
+                row = ns.rows.get(vector_id)
+                if row is None:
+                    row = ns.rows[vector_id] = len(ns.ids)
+                    ns.ids.append(vector_id)
+                    ns.metadata.append(dict(metadata or {}))
+                else:
+                    ns.metadata[row] = dict(metadata or {})
+                buffer[row] = embedding
+            self._dirty.add(namespace)
+        summary.upserted = len(vectors)
+        return summary
+
+    def query_vectors(self, query_embedding: list, top_k: int = 3, namespace: str = None) -> list:
+        """Vectorized cosine top-k over the namespace's normalized embedding matrix."""
+        with self._lock:
+            ns = self._get(namespace)
+            if not ns.ids or top_k <= 0:
+                return []
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            scores = ns.matrix @ (query / norm)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [VectorMatch(ns.ids[i], float(scores[i]), ns.metadata[i]) for i in top]
+
+    def list_ids(self, prefix: str, namespace: str = None) -> Optional[List[str]]:
+        with self._lock:
+            return [vector_id for vector_id in self._get(namespace).ids if vector_id.startswith(prefix)]
+
+    def _delete_rows(self, namespace: str, keep: List[bool]):
+        ns = self._get(namespace)
+        if all(keep):
+            return
+        keep_mask = np.asarray(keep, dtype=bool)
+        ids = [vector_id for vector_id, k in zip(ns.ids, keep) if k]
+        metadata = [meta for meta, k in zip(ns.metadata, keep) if k]
+        matrix = np.array(ns.matrix[keep_mask]) if ids else None
+        self._namespaces[namespace] = _Namespace(ids, matrix, metadata)
+        self._dirty.add(namespace)
+
+    def delete_ids(self, ids: list, namespace: str = None):
+        ids = set(ids)
+        with self._lock:
+            self._delete_rows(namespace, [vector_id not in ids for vector_id in self._get(namespace).ids])
+
+    def delete_by_filter(self, metadata_filter: dict, namespace: str = None):
+        with self._lock:
+            self._delete_rows(namespace, [not matches_filter(meta, metadata_filter) for meta in self._get(namespace).metadata])
+
+    def delete_namespace(self, namespace: str):
+        with self._lock:
+            self._namespaces[namespace] = _Namespace()
+            self._dirty.add(namespace)
+
+    def persist(self):
+        """Saves every namespace changed since the last persist()."""
+        with self._lock:
+            for namespace in self._dirty:
+                self._save(namespace, self._namespaces[namespace])
+            self._dirty.clear()
+
+
+def create_vector_store(backend: str = VECTOR_STORE_BACKEND) -> VectorStore:
+    """Builds the configured vector store backend ("pinecone" or "local")."""
+    if backend == "local":
+        return LocalVectorStore(LOCAL_VECTOR_STORE_PATH)
+    if backend == "pinecone":
+        # Imported here so the local backend works without the Pinecone SDK or network access
+        from src.pinecone_client import PineconeClient
+        return PineconeClient()
+    raise ValueError(f"Unknown vector store backend: {backend!r} (expected 'pinecone' or 'local').")
@@ -1,13 +1,65 @@
 # src/xml_parser.py
 from lxml import etree
 import os
+import re
+from typing import Iterator
+from src.metrics import metrics
 
-def extract_roles_from_xml(xml_filepath: str, role_xpath: str) -> list:
-    """Extracts role names from an XML file using XPath."""
+# XPaths of the form //a/b/text() can be answered by streaming, without building the tree
+_SIMPLE_TEXT_XPATH = re.compile(r"^//((?:[A-Za-z_][\w.-]*/)*[A-Za-z_][\w.-]*)/text\(\)$")
+
+def iter_roles_from_xml(xml_filepath: str, path: str = "role") -> Iterator[str]:
+    """
+    Streams role names from an XML file with etree.iterparse, yielding the stripped
+    text of every element matching `path` (a tag such as "role", or a
+    "parent/child" path matched against the element's closest ancestors).
+    Processed elements are cleared as parsing goes, so memory stays flat
+    regardless of file size. Yields the same strings as the XPath //path/text().
+    """
+    tags = path.strip("/").split("/")
+    context = etree.iterparse(xml_filepath, events=("end",), recover=True, encoding='utf-8', huge_tree=True)
+    for _, element in context:
+        if element.tag == tags[-1] and _has_ancestors(element, tags[:-1]):
+            # text() returns every direct text node: the leading text plus each child's tail
+            texts = [element.text] + [child.tail for child in element]
+            for text in texts:
+                if text is not None:
+                    yield str(text).strip()
+        # The element is complete; drop its content and any already-processed siblings.
+        # Siblings inside a matching element are kept until it ends, since their tails are its text.
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is not None and parent.tag != tags[-1]:
+            while element.getprevious() is not None:
+                del parent[0]
+    del context
+
+def _has_ancestors(element, tags) -> bool:
+    """True if the element's nearest ancestors have the given tags (outermost first)."""
+    for tag in reversed(tags):
+        element = element.getparent()
+        if element is None or element.tag != tag:
+            return False
+    return True
+
+def extract_roles_from_xml(xml_filepath: str, role_xpath: str, streaming: bool = True) -> list:
+    """
+    Extracts role names from an XML file using XPath.
+    Simple //tag/text() XPaths are answered by streaming the file (see
+    iter_roles_from_xml) unless `streaming` is False; other XPaths parse the full tree.
+    """
     if not os.path.exists(xml_filepath):
         print(f"Error: XML file not found at {xml_filepath}")
         return []
+    metrics.incr("xml_bytes", os.path.getsize(xml_filepath))
+    with metrics.span("xml_parse"):
+        return _extract_roles_from_xml(xml_filepath, role_xpath, streaming)
+
+def _extract_roles_from_xml(xml_filepath: str, role_xpath: str, streaming: bool) -> list:
     try:
+        simple_path = _SIMPLE_TEXT_XPATH.match(role_xpath.strip())
+        if streaming and simple_path:
+            return list(iter_roles_from_xml(xml_filepath, simple_path.group(1)))
         # Use a parser that can handle byte strings if file encoding is complex
         parser = etree.XMLParser(recover=True, encoding='utf-8')
         tree = etree.parse(xml_filepath, parser=parser)
@@ -18,4 +70,4 @@ def extract_roles_from_xml(xml_filepath: str, role_xpath: str) -> list:
         return []
     except Exception as e:
         print(f"An unexpected error occurred while parsing XML: {e}")
-        return []
\ No newline at end of file
+        return []